@@ -4,20 +4,57 @@ Bonobo Acoustic Space Visualization - Deployable Dash App
 Mapping human perception of bonobo vocalizations refines emotional understanding across Hominoids
 """
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from dash import Dash, html, dcc, Input, Output, callback
-from flask import send_from_directory
+import plotly.graph_objects as go
+from dash import Dash, html, dcc, Input, Output, State, Patch, ClientsideFunction, callback, ctx, no_update
+from flask import Response, abort, jsonify, request, stream_with_context
+from scipy.spatial import cKDTree
+import functools
 import os
 import warnings
+from aggregates import GroupStats
+from build_spider_plots import RATING_COLUMNS, plot_key, write_spider_plot
+from build_thumbnails import read_manifest as read_thumbnail_manifest
+from dataset import iter_rows
+from export import decode_selection, encode_selection, stream_zip
+from figure_cache import FigureCache
+from filters import FilterIndex, parse_query, to_query
+from lod import VoxelGrid
+from media import find_media, send_media
+from metrics import init_app as init_metrics, startup_phase, timed
+from registry import DatasetRegistry
+from similarity import SimilarityIndex
+from spectrogram import (CACHE_DIR as SPECTROGRAM_CACHE_DIR, DEFAULT_FORMAT, DEFAULT_HOP, DEFAULT_N_FFT, DEFAULT_POINTS,
+                         FORMATS as SPECTROGRAM_FORMATS, SpectrogramParams, spectrogram_file, waveform_file)
 warnings.filterwarnings('ignore')
 
 # --- Data Loading ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-vis_data = pd.read_csv(os.path.join(BASE_DIR, 'data_precomputed.csv'))
 
-AUDIO_DIR = os.path.join(BASE_DIR, 'audio')
-IMAGE_DIR = os.path.join(BASE_DIR, 'spider_plots')
+# Only the columns the app displays; the PCs and rating columns are never loaded
+APP_COLUMNS = [
+    'subject', 'age_class', 'general_arousal', 'valence', 'context', 'context_complet',
+    'context_general', 'file', 'Playback', 'valence_arousal_refined',
+    'UMAP_1', 'UMAP_2', 'UMAP_3', 'UMAP_2D_1', 'UMAP_2D_2', 'has_audio', 'has_image'
+]
+# Datasets listed in datasets.json, loaded on first use into a memory-bounded LRU
+datasets = DatasetRegistry.from_manifest(columns=APP_COLUMNS)
+
+
+def dataset_stats(ds):
+    return {'calls': len(ds.data), 'subjects': ds.data['subject'].nunique(), 'contexts': ds.data['context'].nunique()}
+
+
+with startup_phase('load_data'):
+    home_stats = dataset_stats(datasets.get())
+
+# Rendered width of the spider plot in the left panel (CSS px)
+IMAGE_DISPLAY_WIDTH = 192
+
+# Number of calls ringed by "Show most similar"
+SIMILAR_K = 20
 
 # --- Color Maps ---
 color_map_refined = {
@@ -33,17 +70,255 @@ color_map_valence = {'positive': '#669bbc', 'negative': '#a06cd5'}
 color_map_arousal = {'high': '#C33149', 'low': '#A8C256'}
 color_map_playback = {'Yes': '#99e2b4', 'No': '#036666'}
 
+color_by_options = [
+    {'label': 'Valence-Arousal', 'value': 'valence_arousal_refined'},
+    {'label': 'Arousal', 'value': 'general_arousal'},
+    {'label': 'Valence', 'value': 'valence'},
+    {'label': 'Context', 'value': 'context_complet'},
+    {'label': 'Playback', 'value': 'Playback'},
+    {'label': 'Age class', 'value': 'age_class'},
+    {'label': 'Subject', 'value': 'subject'}
+]
+
+dimension_options = [
+    {'label': '3D', 'value': '3d'},
+    {'label': '2D (WebGL)', 'value': '2d'}
+]
+
 # --- App Setup ---
 app = Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
+init_metrics(server)
+
+
+# --- Media ---
+SPIDER_PLOT_CACHE_DIR = os.environ.get('SPIDER_PLOT_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'spider_plots'))
+
+
+# The default dataset keeps the /segments and /images URLs, others are under /datasets/<id>/
+@functools.lru_cache(maxsize=None)
+def media_files(dataset_id):
+    """Media built for ``dataset_id``: ``(compressed audio, image variants, thumbnail files)``.
+
+    Compressed audio (transcode_audio.py) is keyed by WAV stem, WebP variants
+    (build_thumbnails.py) by PNG stem as ``{width: file name}``.
+    """
+    ds = datasets.describe(dataset_id)
+    compressed_audio = {}
+    if ds.audio_compressed_dir and os.path.isdir(ds.audio_compressed_dir):
+        compressed_audio = {os.path.splitext(name)[0]: name for name in os.listdir(ds.audio_compressed_dir)
+                            if not name.endswith('.tmp')}
+    image_variants = {}
+    if ds.image_thumbs_dir:
+        image_variants = {stem: {int(width): name for width, name in entry['variants'].items()}
+                          for stem, entry in read_thumbnail_manifest(ds.image_thumbs_dir).items()}
+    thumbnail_files = {name for variants in image_variants.values() for name in variants.values()}
+    return compressed_audio, image_variants, thumbnail_files
+
+
+def media_prefix(dataset_id):
+    return '' if dataset_id == datasets.default else f'/datasets/{dataset_id}'
+
+
+def media_dataset(dataset_id):
+    """Settings of ``dataset_id`` (the default dataset if None) without loading it; 404 if unknown."""
+    dataset_id = dataset_id or datasets.default
+    if dataset_id not in datasets:
+        abort(404)
+    return datasets.describe(dataset_id)
+
+
+@server.route('/segments/<path:filename>', defaults={'dataset_id': None})
+@server.route('/datasets/<dataset_id>/segments/<path:filename>')
+@timed('segments', kind='route')
+def serve_audio(filename, dataset_id):
+    ds = media_dataset(dataset_id)
+    return send_media(filename, *[d for d in (ds.audio_compressed_dir, ds.audio_dir) if d])
+
+@server.route('/images/<path:filename>', defaults={'dataset_id': None})
+@server.route('/datasets/<dataset_id>/images/<path:filename>')
+@timed('images', kind='route')
+def serve_image(filename, dataset_id):
+    ds = media_dataset(dataset_id)
+    if filename in media_files(ds.id)[2]:
+        return send_media(filename, ds.image_thumbs_dir, immutable=True)
+    if ds.image_dir and find_media(filename, ds.image_dir):
+        return send_media(filename, ds.image_dir)
+    path = drawn_spider_plot(datasets.get(ds.id), filename)
+    if path is None:
+        abort(404)
+    return send_media(os.path.relpath(path, SPIDER_PLOT_CACHE_DIR), SPIDER_PLOT_CACHE_DIR)
+
+
+def drawn_spider_plot(ds, filename):
+    """Path of the spider plot ``filename`` drawn from the ratings and cached, or None if unrated.
+
+    For plots build_spider_plots.py has not drawn yet.
+    """
+    rated = spider_plot_ratings(ds).get(filename)
+    if rated is None:
+        return None
+    ratings, total = rated
+    stem = os.path.splitext(filename)[0]
+    path = os.path.join(SPIDER_PLOT_CACHE_DIR, ds.id, f'{stem}.{plot_key(ratings, total)}.png')
+    if not os.path.exists(path):
+        write_spider_plot(path, ratings, total)
+    return path
+
+
+def spider_plot_ratings(ds):
+    """``{PNG name: (ratings, total)}`` of the rows with ratings, for plots drawn on demand."""
+    def build():
+        df = ds.load_columns(['file', 'total'] + RATING_COLUMNS)
+        df = df[df[RATING_COLUMNS].notna().all(axis=1)]
+        return {str(row['file']).replace('.wav', '.png'): ({c: float(row[c]) for c in RATING_COLUMNS}, int(row['total']))
+                for row in df.to_dict('records')}
+    return ds.derived('spider_plot_ratings', build)
+
+
+def wav_path(ds, filename):
+    """Path of the original WAV ``filename`` of ``ds``; 404 if missing."""
+    path = find_media(filename, ds.audio_dir) if ds.audio_dir else None
+    if path is None:
+        abort(404)
+    return path
+
 
-@server.route('/segments/<path:filename>')
-def serve_audio(filename):
-    return send_from_directory(AUDIO_DIR, filename)
+def send_cached(path):
+    return send_media(os.path.relpath(path, SPECTROGRAM_CACHE_DIR), SPECTROGRAM_CACHE_DIR)
+
+
+@server.route('/spectrogram/<path:filename>', defaults={'dataset_id': None})
+@server.route('/datasets/<dataset_id>/spectrogram/<path:filename>')
+@timed('spectrogram', kind='route')
+def serve_spectrogram(filename, dataset_id):
+    """STFT spectrogram of a WAV. Query: n_fft, hop, fmax (Hz), format (webp, png or json).
+
+    Only the fixed parameter sets of spectrogram.py are accepted (400 otherwise), which bounds the disk cache.
+    """
+    path = wav_path(media_dataset(dataset_id), filename)
+    fmt = request.args.get('format', DEFAULT_FORMAT)
+    if fmt not in SPECTROGRAM_FORMATS:
+        abort(400, f"format must be one of {', '.join(SPECTROGRAM_FORMATS)}")
+    try:
+        params = SpectrogramParams(request.args.get('n_fft', DEFAULT_N_FFT), request.args.get('hop', DEFAULT_HOP),
+                                   request.args.get('fmax'))
+        return send_cached(spectrogram_file(path, params, fmt))
+    except ValueError as e:
+        abort(400, str(e))
+
+
+@server.route('/waveform/<path:filename>', defaults={'dataset_id': None})
+@server.route('/datasets/<dataset_id>/waveform/<path:filename>')
+@timed('waveform', kind='route')
+def serve_waveform(filename, dataset_id):
+    """Min/max envelope of a WAV as JSON. Query: points (buckets, one of WAVEFORM_POINTS, default 1000)."""
+    path = wav_path(media_dataset(dataset_id), filename)
+    try:
+        return send_cached(waveform_file(path, request.args.get('points', DEFAULT_POINTS, type=int)))
+    except ValueError as e:
+        abort(400, str(e))
+
+
+def audio_url(dataset_id, file_name):
+    """URL of the compressed variant of ``file_name`` if one was built, else of the WAV."""
+    compressed_audio = media_files(dataset_id)[0]
+    return f"{media_prefix(dataset_id)}/segments/{compressed_audio.get(os.path.splitext(file_name)[0], file_name)}"
+
+
+def image_sources(dataset_id, image_name):
+    """``(src, srcSet)`` for a spider plot, preferring the smallest adequate WebP variant."""
+    prefix = media_prefix(dataset_id)
+    variants = media_files(dataset_id)[1].get(os.path.splitext(image_name)[0])
+    if not variants:
+        return f"{prefix}/images/{image_name}", None
+    widths = sorted(variants)
+    # src is the fallback for browsers ignoring srcSet: sized for 2x displays
+    src_width = next((w for w in widths if w >= 2 * IMAGE_DISPLAY_WIDTH), widths[-1])
+    srcset = ', '.join(f"{prefix}/images/{variants[w]} {w}w" for w in widths)
+    return f"{prefix}/images/{variants[src_width]}", srcset
+
+
+def request_dataset():
+    """Loaded dataset named by the ``dataset`` query parameter (default if absent); 404 if unknown."""
+    dataset_id = request.args.get('dataset') or datasets.default
+    if dataset_id not in datasets:
+        abort(404)
+    return datasets.get(dataset_id)
+
+
+def row_by_file(ds):
+    return ds.derived('row_by_file', lambda: {file_name: i for i, file_name in enumerate(ds.data['file'])})
+
+
+# --- Neighbor Prefetch ---
+# Budgets for warming the browser cache with the media of calls near the hovered point
+PREFETCH_CONFIG = {
+    'enabled': os.environ.get('PREFETCH_ENABLED', '1') != '0',
+    'k': int(os.environ.get('PREFETCH_K', 6)),
+    'maxInflight': int(os.environ.get('PREFETCH_MAX_INFLIGHT', 3)),
+    'maxTotal': int(os.environ.get('PREFETCH_MAX_TOTAL', 150)),
+    'debounceMs': int(os.environ.get('PREFETCH_DEBOUNCE_MS', 150)),
+    'imageSizes': f'{IMAGE_DISPLAY_WIDTH}px',
+}
+PREFETCH_MAX_K = 32
+
+def media_index(ds):
+    """``(rows, KD-tree)`` over the UMAP coordinates of the calls with audio or a spider plot."""
+    def build():
+        # Only calls with audio or a spider plot have anything to prefetch
+        rows = np.flatnonzero(ds.data['has_audio'].to_numpy() | ds.data['has_image'].to_numpy())
+        return rows, cKDTree(ds.data[['UMAP_1', 'UMAP_2', 'UMAP_3']].to_numpy()[rows])
+    return ds.derived('media_index', build)
+
+
+@server.route('/api/neighbors/<path:file_name>')
+@timed('api_neighbors', kind='route')
+def nearest_media(file_name):
+    """Media URLs of the ``k`` calls with media nearest to ``file_name`` in UMAP space."""
+    ds = request_dataset()
+    row = row_by_file(ds).get(file_name)
+    if row is None:
+        abort(404)
+    media_rows, tree = media_index(ds)
+    k = max(1, min(request.args.get('k', PREFETCH_CONFIG['k'], type=int), PREFETCH_MAX_K, len(media_rows)))
+    _, nearest = tree.query(ds.data[['UMAP_1', 'UMAP_2', 'UMAP_3']].to_numpy()[row], k=k)
+
+    data = ds.data
+    neighbors = []
+    for i in media_rows[np.atleast_1d(nearest)]:
+        name = data['file'].iat[i]
+        image_src, image_srcset = image_sources(ds.id, name.replace('.wav', '.png')) if data['has_image'].iat[i] else (None, None)
+        neighbors.append({
+            'file': name,
+            'audio': audio_url(ds.id, name) if data['has_audio'].iat[i] else None,
+            'image': image_src,
+            'imageSrcset': image_srcset,
+        })
+    return jsonify({'file': file_name, 'neighbors': neighbors})
+
+
+# --- Metadata Filters ---
+# Columns with a filter index; the export endpoint and the page URL accept all of them:
+# ?subject=Zamba&subject=Habari&Playback=Yes
+FILTER_COLUMNS = ['subject', 'age_class', 'general_arousal', 'valence', 'context', 'context_complet',
+                  'context_general', 'Playback', 'valence_arousal_refined', 'has_audio', 'has_image']
+# Filters with a control in the left panel, and their labels
+FILTER_CONTROLS = {'subject': 'Subject', 'age_class': 'Age class', 'context_general': 'Context',
+                   'Playback': 'Playback', 'has_audio': 'Audio'}
+_filter_value_labels = {'has_audio': {'True': 'With audio', 'False': 'Without audio'}}
+
+
+def filter_index(ds):
+    """Boolean mask of every value of the filter columns, built once per dataset."""
+    return ds.derived('filter_index', lambda: FilterIndex(ds.data, FILTER_COLUMNS))
+
+
+def filter_options(ds, column):
+    labels = _filter_value_labels.get(column, {})
+    return [{'label': f"{labels.get(value, value.replace('_', ' '))} ({count})", 'value': value}
+            for value, count in filter_index(ds).values(column)]
 
-@server.route('/images/<path:filename>')
-def serve_image(filename):
-    return send_from_directory(IMAGE_DIR, filename)
 
 # --- Custom HTML/CSS ---
 app.index_string = '''
@@ -148,13 +423,13 @@ home_page = html.Div([
                 'textAlign': 'center'
             }),
             html.Div([
-                html.Span(f"{len(vis_data)}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
+                html.Span(f"{home_stats['calls']}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
                 html.Span(" vocalizations", style={'color': 'rgba(255,255,255,0.6)', 'fontSize': '14px'}),
                 html.Span("  |  ", style={'color': 'rgba(255,255,255,0.2)', 'fontSize': '14px', 'margin': '0 8px'}),
-                html.Span(f"{vis_data['subject'].nunique()}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
+                html.Span(f"{home_stats['subjects']}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
                 html.Span(" bonobos", style={'color': 'rgba(255,255,255,0.6)', 'fontSize': '14px'}),
                 html.Span("  |  ", style={'color': 'rgba(255,255,255,0.2)', 'fontSize': '14px', 'margin': '0 8px'}),
-                html.Span(f"{vis_data['context'].nunique()}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
+                html.Span(f"{home_stats['contexts']}", style={'color': '#FFFFFF', 'fontWeight': '600', 'fontSize': '18px'}),
                 html.Span(" contexts", style={'color': 'rgba(255,255,255,0.6)', 'fontSize': '14px'}),
             ], style={'marginBottom': '48px', 'textAlign': 'center'}),
             html.Button("Explore the Acoustic Space", id='enter-btn', n_clicks=0, style={
@@ -223,9 +498,11 @@ viz_page = html.Div([
             html.Div([
                 html.H4("Audio Player", style={'color': '#FFFFFF', 'marginBottom': 8, 'fontSize': 12, 'fontWeight': '400', 'letterSpacing': '0.5px'}),
                 html.Audio(id='audio-player', controls=True, style={'width': '100%', 'marginBottom': 6, 'borderRadius': '4px'}),
-                html.Div(id='audio-info', style={'marginBottom': 16, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'}),
+                html.Div(id='audio-info', style={'marginBottom': 8, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'}),
+                html.Img(id='spectrogram-viewer', style={'width': '100%', 'height': '96px', 'borderRadius': '4px',
+                                                         'marginBottom': 16, 'backgroundColor': '#000'}),
                 html.H4("Spider Plot", style={'color': '#FFFFFF', 'marginBottom': 8, 'fontSize': 12, 'fontWeight': '400', 'letterSpacing': '0.5px'}),
-                html.Img(id='image-viewer', style={'width': '100%', 'borderRadius': '4px', 'marginBottom': 6}),
+                html.Img(id='image-viewer', sizes=f'{IMAGE_DISPLAY_WIDTH}px', style={'width': '100%', 'borderRadius': '4px', 'marginBottom': 6}),
                 html.Div(id='image-info', style={'marginBottom': 12, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'})
             ], style={
                 'backgroundColor': 'rgba(255,255,255,0.03)',
@@ -235,6 +512,59 @@ viz_page = html.Div([
                 'border': '1px solid rgba(255,255,255,0.06)'
             }),
 
+            # Similar calls
+            html.Div([
+                html.Button(f"Show {SIMILAR_K} most similar", id='similar-btn', n_clicks=0, style={
+                    'flex': 1, 'padding': '5px 8px', 'fontSize': '11px',
+                    'fontFamily': 'Space Grotesk, sans-serif', 'color': 'rgba(255,255,255,0.7)',
+                    'backgroundColor': 'transparent', 'border': '1px solid rgba(255,255,255,0.2)',
+                    'borderRadius': '3px', 'cursor': 'pointer'
+                }),
+                html.Button("Clear", id='similar-clear-btn', n_clicks=0, style={
+                    'padding': '5px 8px', 'fontSize': '11px', 'marginLeft': 6,
+                    'fontFamily': 'Space Grotesk, sans-serif', 'color': 'rgba(255,255,255,0.5)',
+                    'backgroundColor': 'transparent', 'border': '1px solid rgba(255,255,255,0.1)',
+                    'borderRadius': '3px', 'cursor': 'pointer'
+                })
+            ], style={'display': 'flex', 'marginBottom': 6}),
+            html.Div(id='similar-info', style={'marginBottom': 16, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'}),
+
+            # Box/lasso selection (2D view) and/or the filters, and their zip export
+            html.Div(id='selection-info', children="Box or lasso select in the 2D view, or filter, to export calls",
+                     style={'marginBottom': 6, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'}),
+            html.A("Download selection (.zip)", id='export-link', href=None, style={'display': 'none'}),
+
+            # Dataset (only shown when datasets.json lists several)
+            html.Div([
+                html.Label("Dataset", style={
+                    'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
+                    'marginBottom': 6, 'display': 'block', 'letterSpacing': '1px', 'textTransform': 'uppercase'
+                }),
+                dcc.Dropdown(
+                    id='dataset-dropdown',
+                    options=datasets.options(),
+                    value=datasets.default,
+                    clearable=False,
+                    style={'backgroundColor': '#2a2a2a', 'borderRadius': '4px',
+                           'border': '1px solid rgba(255,255,255,0.1)', 'color': '#FFFFFF'}
+                )
+            ], style={'marginBottom': 16, 'display': 'block' if len(datasets) > 1 else 'none'}),
+
+            # View (3D scatter or the lighter 2D WebGL projection)
+            html.Label("View", style={
+                'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
+                'marginBottom': 6, 'display': 'block', 'letterSpacing': '1px', 'textTransform': 'uppercase'
+            }),
+            dcc.Dropdown(
+                id='dimension-dropdown',
+                options=dimension_options,
+                value='3d',
+                clearable=False,
+                style={'backgroundColor': '#2a2a2a', 'borderRadius': '4px',
+                       'border': '1px solid rgba(255,255,255,0.1)', 'color': '#FFFFFF',
+                       'marginBottom': 16}
+            ),
+
             # Color by
             html.Label("Color by", style={
                 'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
@@ -242,16 +572,10 @@ viz_page = html.Div([
             }),
             dcc.Dropdown(
                 id='color-dropdown',
-                options=[
-                    {'label': 'Valence-Arousal', 'value': 'valence_arousal_refined'},
-                    {'label': 'Arousal', 'value': 'general_arousal'},
-                    {'label': 'Valence', 'value': 'valence'},
-                    {'label': 'Context', 'value': 'context_complet'},
-                    {'label': 'Playback', 'value': 'Playback'},
-                    {'label': 'Age class', 'value': 'age_class'},
-                    {'label': 'Subject', 'value': 'subject'}
-                ],
+                options=color_by_options,
                 value='valence_arousal_refined',
+                # Every trace index, patch and overlay is per color group, so one is always selected
+                clearable=False,
                 style={'backgroundColor': '#2a2a2a', 'borderRadius': '4px',
                        'border': '1px solid rgba(255,255,255,0.1)', 'color': '#FFFFFF',
                        'marginBottom': 16}
@@ -272,6 +596,23 @@ viz_page = html.Div([
                 )
             ], id='category-highlight-container', style={'marginBottom': 16, 'display': 'none'}),
 
+            # Metadata filters (mirrored in the page URL)
+            html.Label("Filters", style={
+                'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
+                'marginBottom': 6, 'display': 'block', 'letterSpacing': '1px', 'textTransform': 'uppercase'
+            }),
+            *[dcc.Dropdown(
+                id=f'filter-{column}',
+                options=filter_options(datasets.get(), column),
+                value=[],
+                multi=True,
+                placeholder=label,
+                style={'backgroundColor': '#2a2a2a', 'borderRadius': '4px',
+                       'border': '1px solid rgba(255,255,255,0.1)', 'color': '#FFFFFF',
+                       'marginBottom': 6, 'fontSize': 12}
+            ) for column, label in FILTER_CONTROLS.items()],
+            html.Div(id='filter-info', style={'marginBottom': 16, 'fontSize': 10, 'color': '#666', 'textAlign': 'center'}),
+
             # Point size
             html.Label("Point size", style={
                 'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
@@ -293,6 +634,19 @@ viz_page = html.Div([
                 marks={i/10: {'label': f'{i/10:.1f}', 'style': {'color': '#555', 'fontSize': '10px'}} for i in range(3, 11, 2)},
                 tooltip={"placement": "bottom", "always_visible": False}
             ),
+
+            # Statistics of the groups of the Color by column
+            html.Label("Groups", style={
+                'fontWeight': '400', 'color': 'rgba(255,255,255,0.5)', 'fontSize': 11,
+                'marginTop': 16, 'marginBottom': 6, 'display': 'block', 'letterSpacing': '1px', 'textTransform': 'uppercase'
+            }),
+            dcc.Checklist(
+                id='centroid-toggle',
+                options=[{'label': ' Show centroids', 'value': 'show'}],
+                value=[],
+                style={'fontSize': 11, 'color': 'rgba(255,255,255,0.7)', 'marginBottom': 8}
+            ),
+            html.Div(id='group-stats', style={'maxHeight': '260px', 'overflow': 'auto', 'fontSize': 10, 'color': '#aaa'}),
         ], style={
             'width': '240px', 'minWidth': '240px',
             'padding': '12px',
@@ -317,13 +671,26 @@ viz_page = html.Div([
         'height': 'calc(100vh - 45px)'
     }),
 
-    # Hidden dummy for dimension dropdown (kept for callback compatibility)
-    dcc.Dropdown(id='dimension-dropdown', value='3d', style={'display': 'none'})
+    # Normalized filter state ({column: [values]}), kept in sync with the URL
+    dcc.Store(id='filters', data={}),
+    # Dataset, color and view of the figure last sent whole, which filter patches apply to
+    dcc.Store(id='plot-key'),
+
+    # Region the LOD refinement last sent ([] or None: the overview)
+    dcc.Store(id='lod-bounds'),
+
+    # Rows currently ringed by the similarity overlay
+    dcc.Store(id='similar-rows', data=[]),
+
+    # Hover prefetch budgets (read by assets/prefetch.js)
+    dcc.Store(id='prefetch-config', data=PREFETCH_CONFIG),
+    dcc.Store(id='prefetch-sink')
 ], id='viz-page', style={'display': 'none'})
 
 
 # --- Main Layout ---
 app.layout = html.Div([
+    dcc.Location(id='url', refresh=False),
     home_page,
     viz_page
 ], style={
@@ -339,15 +706,56 @@ app.layout = html.Div([
     [Output('home-page', 'style'),
      Output('viz-page', 'style')],
     [Input('enter-btn', 'n_clicks'),
-     Input('home-btn', 'n_clicks')]
+     Input('home-btn', 'n_clicks'),
+     Input('url', 'search')]
 )
-def navigate(enter_clicks, home_clicks):
+@timed('navigate')
+def navigate(enter_clicks, home_clicks, search):
     from dash import ctx
     if ctx.triggered_id == 'enter-btn' and enter_clicks:
         return {'display': 'none'}, {'display': 'block'}
+    if ctx.triggered_id in (None, 'url'):
+        # A shared link with filters opens straight on the visualization
+        return ({'display': 'none'}, {'display': 'block'}) if search else (no_update, no_update)
     return {}, {'display': 'none'}
 
 
+@callback(
+    [Output('url', 'search'),
+     Output('filters', 'data'),
+     Output('filter-info', 'children')]
+    + [Output(f'filter-{column}', 'value') for column in FILTER_CONTROLS]
+    + [Output(f'filter-{column}', 'options') for column in FILTER_CONTROLS],
+    [Input('url', 'search'),
+     Input('dataset-dropdown', 'value')]
+    + [Input(f'filter-{column}', 'value') for column in FILTER_CONTROLS],
+    [State('filters', 'data')]
+)
+@timed('sync_filters')
+def sync_filters(search, dataset_id, *args):
+    """Keep the URL, the filter dropdowns and the ``filters`` store in step, whichever one changed."""
+    *values, current = args
+    ds = datasets.get(dataset_id)
+    index = filter_index(ds)
+    filters = parse_query(search)
+    if ctx.triggered_id in {f'filter-{column}' for column in FILTER_CONTROLS}:
+        # Columns without a control (e.g. ?valence=positive from a shared link) are kept
+        filters.update(zip(FILTER_CONTROLS, values))
+    # Values unknown to the dataset (another dataset's, a mistyped URL) are dropped
+    filters = index.normalize(filters)
+
+    query = to_query(filters)
+    mask = index.mask(filters)
+    info = "" if mask is None else f"{int(mask.sum())} of {len(ds.data)} calls"
+    options = ([filter_options(ds, column) for column in FILTER_CONTROLS]
+               if ctx.triggered_id in (None, 'dataset-dropdown') else [no_update] * len(FILTER_CONTROLS))
+    return (query if query != (search or '') else no_update,
+            filters if filters != current else no_update,
+            info,
+            *[filters.get(column, []) for column in FILTER_CONTROLS],
+            *options)
+
+
 # --- Plot Callback ---
 labels_dict = {
     'general_arousal': 'Arousal', 'valence': 'Valence',
@@ -367,77 +775,150 @@ labels_dict = {
 }
 
 
-@callback(
-    [Output('3d-scatter', 'figure'),
-     Output('category-highlight-container', 'style'),
-     Output('category-highlight', 'options')],
-    [Input('color-dropdown', 'value'),
-     Input('size-slider', 'value'),
-     Input('opacity-slider', 'value'),
-     Input('category-highlight', 'value')]
-)
-def update_plot(color_by, point_size, opacity, highlight_category):
-    custom_cols = ['subject', 'context', 'valence_arousal_refined', 'file', 'has_audio', 'has_image', 'context_complet', 'context_general']
+def trace_names(ds, color_by):
+    """Trace names in the order px.scatter/px.scatter_3d emit them for ``color_by``."""
+    if color_by == 'valence_arousal_refined':
+        present = list(ds.data[color_by].unique())
+        # Categories outside the order (e.g. 'unknown' for freshly ingested calls) come last, as in px
+        return ([cat for cat in refined_category_order if cat in present]
+                + [cat for cat in present if cat not in refined_category_order])
+    return list(ds.data[color_by].unique())
+
 
+def _color_map(ds, color_by):
     if color_by == 'valence_arousal_refined':
-        cmap = color_map_refined
+        return color_map_refined
     elif color_by == 'valence':
-        cmap = color_map_valence
+        return color_map_valence
     elif color_by == 'general_arousal':
-        cmap = color_map_arousal
+        return color_map_arousal
     elif color_by == 'Playback':
-        cmap = color_map_playback
-    else:
-        cmap = None
+        return color_map_playback
+    # Pin the default palette to the full dataset's categories so sampled subsets keep the same colors
+    palette = px.colors.qualitative.Plotly
+    return {name: palette[i % len(palette)] for i, name in enumerate(trace_names(ds, color_by))}
 
-    cat_orders = {'valence_arousal_refined': refined_category_order} if color_by == 'valence_arousal_refined' else None
 
-    fig = px.scatter_3d(
-        vis_data,
-        x='UMAP_1', y='UMAP_2', z='UMAP_3',
-        color=color_by,
-        color_discrete_map=cmap,
-        category_orders=cat_orders,
-        labels=labels_dict,
-        hover_name='file',
-        custom_data=custom_cols
-    )
+CUSTOM_COLS = ['subject', 'context', 'valence_arousal_refined', 'file', 'has_audio', 'has_image', 'context_complet', 'context_general']
+HOVER_TEMPLATE = ('<b>%{hovertext}</b><br><br>'
+                  '<b>Subject:</b> %{customdata[0]}<br>'
+                  '<b>Context General:</b> %{customdata[7]}<br>'
+                  '<b>Context:</b> %{customdata[6]}<br>'
+                  '<b>Valence-Arousal:</b> %{customdata[2]}<br>'
+                  '<extra></extra>')
+# Trace meta tag of the overlay ringing the results of a similarity search
+SIMILAR_META = 'similar'
+# Trace meta tag of the overlay marking each group's centroid
+CENTROID_META = 'centroids'
 
+
+def _trace_visible(trace_name, color_by, highlight_category):
     if highlight_category and highlight_category != 'All' and color_by == 'valence_arousal_refined':
-        fig.data = [t for t in fig.data if t.name == highlight_category]
+        return trace_name == highlight_category
+    return True
+
+
+# Embedding columns plotted in each view mode
+DIMENSION_COLUMNS = {
+    '3d': ['UMAP_1', 'UMAP_2', 'UMAP_3'],
+    '2d': ['UMAP_2D_1', 'UMAP_2D_2'],
+}
+
+_axis_style = dict(gridcolor="rgba(255,255,255,0.06)", showgrid=True, gridwidth=1,
+                   title_font=dict(color='#888', size=11),
+                   tickfont=dict(color='#555', size=9))
+
+
+def _axis_range(data, column):
+    return [data[column].min() - 0.1, data[column].max() + 0.1]
+
+
+def build_base_figure(ds, color_by, dimension='3d', data=None):
+    """Build the scatter figure of dataset ``ds`` for ``color_by`` with default marker styling.
+
+    ``dimension`` '3d' renders Scatter3d traces, '2d' renders WebGL Scattergl
+    traces of the 2D projection. ``data`` (a subset of rows) defaults to all of
+    ``ds``; axis ranges always span all of ``ds``, so a subset keeps the same scene box.
+    """
+    data = ds.data if data is None else data
+    cat_orders = {'valence_arousal_refined': refined_category_order} if color_by == 'valence_arousal_refined' else None
+    columns = DIMENSION_COLUMNS[dimension]
+
+    if dimension == '2d':
+        fig = px.scatter(
+            data,
+            x=columns[0], y=columns[1],
+            color=color_by,
+            color_discrete_map=_color_map(ds, color_by),
+            category_orders=cat_orders,
+            labels=labels_dict,
+            hover_name='file',
+            custom_data=CUSTOM_COLS,
+            render_mode='webgl'
+        )
+    else:
+        fig = px.scatter_3d(
+            data,
+            x=columns[0], y=columns[1], z=columns[2],
+            color=color_by,
+            color_discrete_map=_color_map(ds, color_by),
+            category_orders=cat_orders,
+            labels=labels_dict,
+            hover_name='file',
+            custom_data=CUSTOM_COLS
+        )
+
+    # Subsets (level-of-detail samples) can miss categories: pad with empty traces
+    # so trace indices always line up with trace_names() for patches
+    names = trace_names(ds, color_by)
+    present = {trace.name for trace in fig.data}
+    for name in names:
+        if name not in present:
+            empty = dict(x=[], y=[], mode='markers', name=name, showlegend=False)
+            fig.add_trace(go.Scattergl(**empty) if dimension == '2d' else go.Scatter3d(z=[], **empty))
+    fig.data = sorted(fig.data, key=lambda trace: names.index(trace.name))
 
     fig.update_traces(
-        marker=dict(size=point_size, opacity=opacity, line=dict(width=0, color='rgba(0,0,0,0)')),
-        hovertemplate='<b>%{hovertext}</b><br><br>'
-                      '<b>Subject:</b> %{customdata[0]}<br>'
-                      '<b>Context General:</b> %{customdata[7]}<br>'
-                      '<b>Context:</b> %{customdata[6]}<br>'
-                      '<b>Valence-Arousal:</b> %{customdata[2]}<br>'
-                      '<extra></extra>'
+        marker=dict(size=3, opacity=1.0, line=dict(width=0, color='rgba(0,0,0,0)')),
+        hovertemplate=HOVER_TEMPLATE
     )
 
-    x_range = [vis_data['UMAP_1'].min() - 0.1, vis_data['UMAP_1'].max() + 0.1]
-    y_range = [vis_data['UMAP_2'].min() - 0.1, vis_data['UMAP_2'].max() + 0.1]
-    z_range = [vis_data['UMAP_3'].min() - 0.1, vis_data['UMAP_3'].max() + 0.1]
+    # Always present (empty until a similarity search) so it can be patched in place
+    overlay = dict(mode='markers', name='Similar calls', meta=SIMILAR_META, showlegend=False,
+                   marker=dict(symbol='circle-open', size=9, color='#FFFFFF'),
+                   hovertemplate=HOVER_TEMPLATE)
+    # Group centroids, after it; filled in by style_figure when shown
+    centroids = dict(mode='markers+text', name='Centroids', meta=CENTROID_META, showlegend=False,
+                     marker=dict(symbol='diamond', size=10, line=dict(width=1, color='#FFFFFF')),
+                     textposition='top center', textfont=dict(color='#FFFFFF', size=10),
+                     hovertemplate='<b>%{text}</b><br>%{hovertext}<extra>centroid</extra>')
+    if dimension == '2d':
+        fig.add_trace(go.Scattergl(x=[], y=[], **overlay))
+        fig.add_trace(go.Scattergl(x=[], y=[], **centroids))
+    else:
+        fig.add_trace(go.Scatter3d(x=[], y=[], z=[], **overlay))
+        fig.add_trace(go.Scatter3d(x=[], y=[], z=[], **centroids))
+
+    if dimension == '2d':
+        fig.update_layout(
+            xaxis=dict(_axis_style, title="Dimension 1", zeroline=False, range=_axis_range(ds.data, columns[0])),
+            yaxis=dict(_axis_style, title="Dimension 2", zeroline=False, range=_axis_range(ds.data, columns[1]))
+        )
+    else:
+        fig.update_layout(
+            scene=dict(
+                xaxis_title="Dimension 1", yaxis_title="Dimension 2", zaxis_title="Dimension 3",
+                bgcolor='#1a1a1a',
+                xaxis=dict(_axis_style, backgroundcolor="#1a1a1a", range=_axis_range(ds.data, columns[0])),
+                yaxis=dict(_axis_style, backgroundcolor="#1a1a1a", range=_axis_range(ds.data, columns[1])),
+                zaxis=dict(_axis_style, backgroundcolor="#1a1a1a", range=_axis_range(ds.data, columns[2])),
+                camera=dict(eye=dict(x=1.8, y=1.8, z=1.8))
+            )
+        )
 
     fig.update_layout(
-        scene=dict(
-            xaxis_title="Dimension 1", yaxis_title="Dimension 2", zaxis_title="Dimension 3",
-            bgcolor='#1a1a1a',
-            xaxis=dict(backgroundcolor="#1a1a1a", gridcolor="rgba(255,255,255,0.06)",
-                       showgrid=True, gridwidth=1,
-                       title_font=dict(color='#888', size=11),
-                       tickfont=dict(color='#555', size=9), range=x_range),
-            yaxis=dict(backgroundcolor="#1a1a1a", gridcolor="rgba(255,255,255,0.06)",
-                       showgrid=True, gridwidth=1,
-                       title_font=dict(color='#888', size=11),
-                       tickfont=dict(color='#555', size=9), range=y_range),
-            zaxis=dict(backgroundcolor="#1a1a1a", gridcolor="rgba(255,255,255,0.06)",
-                       showgrid=True, gridwidth=1,
-                       title_font=dict(color='#888', size=11),
-                       tickfont=dict(color='#555', size=9), range=z_range),
-            camera=dict(eye=dict(x=1.8, y=1.8, z=1.8))
-        ),
+        # Keep the user's zoom/camera across figure replacements (color changes, refinement)
+        uirevision=dimension,
         paper_bgcolor='#1a1a1a', plot_bgcolor='#1a1a1a',
         margin=dict(l=0, r=0, t=0, b=0),
         legend=dict(
@@ -447,51 +928,592 @@ def update_plot(color_by, point_size, opacity, highlight_category):
             yanchor='middle', y=0.5, xanchor='right', x=0.99
         )
     )
+    return fig
+
+
+# --- Level of Detail ---
+# Above this many points the scatter shows a density-preserving sample, refined on zoom
+LOD_MAX_POINTS = int(os.environ.get('LOD_MAX_POINTS', 20000))
+# Distance of the default 3D camera eye (1.8, 1.8, 1.8) from the scene center
+DEFAULT_EYE_DISTANCE = float(np.linalg.norm([1.8, 1.8, 1.8]))
+
+
+def lod_grid(ds, dimension):
+    return ds.derived(f'lod_{dimension}', lambda: VoxelGrid(ds.data[DIMENSION_COLUMNS[dimension]].to_numpy()))
+
+
+def build_overview_figure(ds, color_by, dimension):
+    """Base figure of the whole dataset, sampled down to LOD_MAX_POINTS when larger."""
+    if len(ds.data) <= LOD_MAX_POINTS:
+        return build_base_figure(ds, color_by, dimension)
+    rows = lod_grid(ds, dimension).sample(LOD_MAX_POINTS)
+    return build_base_figure(ds, color_by, dimension, data=ds.data.iloc[rows])
+
+
+def view_bounds(ds, relayout, dimension):
+    """Visible region after a ``relayoutData`` event.
+
+    Returns per-axis ``(low, high)`` bounds, ``[]`` when the whole dataset is
+    in view, or None when the event did not move the view. 3D bounds are
+    approximated from the camera: the scene box spans [-1, 1] in camera
+    coordinates, and moving the eye closer than the default zooms in.
+    """
+    if dimension == '2d':
+        if any(key.endswith('autorange') for key in relayout) or 'autosize' in relayout:
+            return []
+        bounds = []
+        for axis in ('xaxis', 'yaxis'):
+            limits = relayout.get(f'{axis}.range') or [relayout.get(f'{axis}.range[0]'), relayout.get(f'{axis}.range[1]')]
+            bounds.append(None if None in limits else tuple(limits))
+        return bounds if any(bounds) else None
+
+    camera = relayout.get('scene.camera')
+    if camera is None:
+        return None
+    # The scene box: the axis ranges of build_base_figure
+    lo, hi = np.array([_axis_range(ds.data, column) for column in DIMENSION_COLUMNS[dimension]]).T
+    half = (hi - lo) / 2
+    center_norm = np.array([camera.get('center', {}).get(axis, 0) for axis in 'xyz'])
+    eye = np.array([camera['eye'][axis] for axis in 'xyz'])
+    zoom = np.linalg.norm(eye - center_norm) / DEFAULT_EYE_DISTANCE
+    if zoom >= 1:
+        return []
+    center = lo + half + center_norm * half
+    # Generous margin: the view frustum is wider than the box around the center
+    extent = half * zoom * 1.5
+    return [(float(c - e), float(c + e)) for c, e in zip(center, extent)]
+
+
+FIGURE_CACHE_VERSION = '7'
+FIGURE_CACHE_DIR = os.environ.get('FIGURE_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'figures'))
+
+
+def figure_cache(ds):
+    """Figure cache of ``ds``, in its own directory so warming one dataset never prunes another's."""
+    return ds.derived('figure_cache', lambda: FigureCache(
+        functools.partial(build_overview_figure, ds), ds.csv_path,
+        # Overviews are sampled down to LOD_MAX_POINTS, so a changed budget invalidates them
+        cache_dir=os.path.join(FIGURE_CACHE_DIR, ds.id), version=f'{FIGURE_CACHE_VERSION}-lod{LOD_MAX_POINTS}'
+    ))
+
+
+# Other datasets build (or read back from disk) their figures on first use
+if os.environ.get('FIGURE_CACHE_WARM', '1') != '0':
+    with startup_phase('warm_figures'):
+        figure_cache(datasets.get()).warm((opt['value'], dim['value'])
+                                          for opt in color_by_options for dim in dimension_options)
+
+
+def similar_trace_data(ds, rows, dimension):
+    """Overlay trace properties ringing ``rows`` of ``ds``."""
+    rows = list(rows or [])
+    subset = ds.data.iloc[rows]
+    return {
+        **{axis: subset[column].tolist() for axis, column in zip('xyz', DIMENSION_COLUMNS[dimension])},
+        'hovertext': subset['file'].tolist(),
+        'customdata': subset[CUSTOM_COLS].astype(object).values.tolist(),
+        'showlegend': bool(rows),
+    }
+
+
+def group_stats(ds, column):
+    """Centroids, dispersion and separation of the groups of ``column``, computed once per column."""
+    def build():
+        spaces = {f'umap_{dimension}': ds.data[columns].to_numpy() for dimension, columns in DIMENSION_COLUMNS.items()}
+        spaces['pc'] = similarity_index(ds).features
+        return GroupStats(ds.data[column].to_numpy(), spaces)
+    return ds.derived(f'group_stats:{column}', build)
+
+
+def centroid_trace_data(ds, color_by, dimension, show_centroids):
+    """Centroid overlay properties: one marker per group of ``color_by``, or none."""
+    columns = DIMENSION_COLUMNS[dimension]
+    if not show_centroids:
+        return {**{axis: [] for axis in 'xyz'[:len(columns)]}, 'text': [], 'hovertext': []}
+    stats = group_stats(ds, color_by)
+    space = stats.spaces[f'umap_{dimension}']
+    colors = _color_map(ds, color_by)
+    hovertext = [f'{n} calls<br>Spread: {spread:.2f} (PC {pc_spread:.1f})<br>Separation: {sep:.2f}'
+                 for n, spread, pc_spread, sep in zip(stats.counts, space['dispersion'],
+                                                      stats.spaces['pc']['dispersion'], space['separation'])]
+    return {
+        **{axis: space['centroids'][:, i].tolist() for i, axis in enumerate('xyz'[:len(columns)])},
+        'text': stats.groups,
+        'hovertext': hovertext,
+        'marker': {'color': [colors.get(group, '#FFFFFF') for group in stats.groups]},
+    }
+
+
+def trace_codes(ds, color_by):
+    """Index in trace_names() of each row's trace for ``color_by`` (-1 for a missing value)."""
+    return ds.derived(f'trace_codes:{color_by}',
+                      lambda: pd.Categorical(ds.data[color_by], categories=trace_names(ds, color_by)).codes)
+
+
+def custom_data(ds):
+    """CUSTOM_COLS of every row as an object array, for slicing into trace customdata."""
+    return ds.derived('custom_data', lambda: ds.data[CUSTOM_COLS].astype(object).to_numpy())
+
+
+def filtered_trace_data(ds, color_by, dimension, mask):
+    """Points of each color trace (in trace_names() order) restricted to the rows of ``mask``.
+
+    Rows are split into traces from their precomputed trace codes, so no
+    figure is rebuilt. More matching rows than LOD_MAX_POINTS are sampled
+    like the overview; a None ``mask`` gives the unfiltered points.
+    """
+    n_matches = len(ds.data) if mask is None else int(mask.sum())
+    if n_matches > LOD_MAX_POINTS:
+        rows = lod_grid(ds, dimension).sample(LOD_MAX_POINTS, mask)
+    else:
+        rows = np.arange(len(ds.data)) if mask is None else np.flatnonzero(mask)
+    codes = trace_codes(ds, color_by)[rows]
+    # A stable sort keeps each trace's points in row order, as px emits them
+    order = np.argsort(codes, kind='stable')
+    rows, codes = rows[order], codes[order]
+    bounds = np.searchsorted(codes, np.arange(len(trace_names(ds, color_by)) + 1))
+
+    coords = ds.data[DIMENSION_COLUMNS[dimension]].to_numpy()
+    files = ds.data['file'].to_numpy()
+    custom = custom_data(ds)
+    traces = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        trace_rows = rows[start:end]
+        traces.append({
+            **{axis: coords[trace_rows, i] for i, axis in enumerate('xyz'[:coords.shape[1]])},
+            'hovertext': files[trace_rows],
+            'customdata': custom[trace_rows],
+        })
+    return traces
+
+
+def style_figure(ds, base, color_by, dimension, point_size, opacity, highlight_category, similar_rows=None,
+                 show_centroids=False, filter_mask=None):
+    """Apply the current marker styling, highlight, filter and overlays to a base figure dict."""
+    filtered = None if filter_mask is None else filtered_trace_data(ds, color_by, dimension, filter_mask)
+    # Shallow copies only: the cached base figure is shared between requests
+    data = []
+    for trace in base['data']:
+        if trace.get('meta') == SIMILAR_META:
+            data.append(dict(trace, **similar_trace_data(ds, similar_rows, dimension)))
+            continue
+        if trace.get('meta') == CENTROID_META:
+            overlay = centroid_trace_data(ds, color_by, dimension, show_centroids)
+            marker = dict(trace['marker'], **overlay.pop('marker', {}))
+            data.append(dict(trace, marker=marker, **overlay))
+            continue
+        trace = dict(trace, marker=dict(trace['marker'], size=point_size, opacity=opacity))
+        if filtered is not None:
+            trace.update(filtered[len(data)])
+        # Hide rather than drop non-highlighted traces so trace indices stay stable for patches
+        trace['visible'] = _trace_visible(trace['name'], color_by, highlight_category)
+        data.append(trace)
+    return dict(base, data=data)
+
+
+def build_figure(ds, color_by, dimension, point_size, opacity, highlight_category, similar_rows=None,
+                 show_centroids=False, filter_mask=None):
+    """Full figure from the cached base figure, with the current marker styling and filter applied."""
+    return style_figure(ds, figure_cache(ds).get((color_by, dimension)), color_by, dimension,
+                        point_size, opacity, highlight_category, similar_rows, show_centroids, filter_mask)
+
+
+def patch_figure(ds, triggered_id, color_by, point_size, opacity, highlight_category):
+    """Partial figure update touching only marker properties or trace visibility."""
+    patched = Patch()
+    for i, name in enumerate(trace_names(ds, color_by)):
+        if triggered_id == 'size-slider':
+            patched['data'][i]['marker']['size'] = point_size
+        elif triggered_id == 'opacity-slider':
+            patched['data'][i]['marker']['opacity'] = opacity
+        elif triggered_id == 'category-highlight':
+            patched['data'][i]['visible'] = _trace_visible(name, color_by, highlight_category)
+    return patched
+
+
+@callback(
+    [Output('3d-scatter', 'figure'),
+     Output('category-highlight-container', 'style'),
+     Output('category-highlight', 'options'),
+     Output('plot-key', 'data')],
+    [Input('dataset-dropdown', 'value'),
+     Input('color-dropdown', 'value'),
+     Input('dimension-dropdown', 'value'),
+     Input('size-slider', 'value'),
+     Input('opacity-slider', 'value'),
+     Input('category-highlight', 'value'),
+     Input('centroid-toggle', 'value'),
+     Input('filters', 'data')],
+    [State('similar-rows', 'data'),
+     State('plot-key', 'data')]
+)
+@timed('update_plot')
+def update_plot(dataset_id, color_by, dimension, point_size, opacity, highlight_category, centroid_toggle,
+                filters, similar_rows, plot_key):
+    ds = datasets.get(dataset_id)
+    show_centroids = bool(centroid_toggle)
+    filter_mask = filter_index(ds).mask(filters or {})
+    key = [ds.id, color_by, dimension]
+    # A filter change only replaces the points of the color traces: mask intersections, no figure rebuild.
+    # The key guards against patching a figure not drawn yet (filters from the URL on load) or of another dataset
+    if ctx.triggered_id == 'filters' and plot_key == key:
+        patched = Patch()
+        for i, trace in enumerate(filtered_trace_data(ds, color_by, dimension, filter_mask)):
+            for name, value in trace.items():
+                patched['data'][i][name] = value
+        return patched, no_update, no_update, no_update
+    # Slider and highlight changes only patch the figure already in the browser
+    if ctx.triggered_id in ('size-slider', 'opacity-slider', 'category-highlight'):
+        return (patch_figure(ds, ctx.triggered_id, color_by, point_size, opacity, highlight_category),
+                no_update, no_update, no_update)
+    if ctx.triggered_id == 'centroid-toggle':
+        # The centroid overlay sits after the color traces and the similar-calls overlay
+        patched = Patch()
+        overlay = centroid_trace_data(ds, color_by, dimension, show_centroids)
+        index = len(trace_names(ds, color_by)) + 1
+        for name, value in overlay.items():
+            if name == 'marker':
+                # Only the colors: assigning the marker dict would drop its symbol and size
+                patched['data'][index]['marker']['color'] = value['color']
+            else:
+                patched['data'][index][name] = value
+        return patched, no_update, no_update, no_update
+    # Rows of a similarity search index the previous dataset; show_similar clears them
+    if ctx.triggered_id == 'dataset-dropdown':
+        similar_rows = []
+
+    fig = build_figure(ds, color_by, dimension, point_size, opacity, highlight_category, similar_rows,
+                       show_centroids, filter_mask)
 
     if color_by == 'valence_arousal_refined':
         container_style = {'marginBottom': 16, 'display': 'block'}
         category_options = [{'label': 'All Categories', 'value': 'All'}] + \
                            [{'label': cat.replace('_', ' ').title(), 'value': cat}
-                            for cat in refined_category_order if cat in vis_data['valence_arousal_refined'].values]
+                            for cat in refined_category_order if cat in ds.data['valence_arousal_refined'].values]
     else:
         container_style = {'marginBottom': 16, 'display': 'none'}
         category_options = []
 
-    return fig, container_style, category_options
+    return fig, container_style, category_options, key
+
+
+@callback(
+    [Output('3d-scatter', 'figure', allow_duplicate=True),
+     Output('lod-bounds', 'data')],
+    Input('3d-scatter', 'relayoutData'),
+    [State('dataset-dropdown', 'value'),
+     State('color-dropdown', 'value'),
+     State('dimension-dropdown', 'value'),
+     State('size-slider', 'value'),
+     State('opacity-slider', 'value'),
+     State('category-highlight', 'value'),
+     State('similar-rows', 'data'),
+     State('centroid-toggle', 'value'),
+     State('filters', 'data'),
+     State('lod-bounds', 'data')],
+    prevent_initial_call=True
+)
+@timed('refine_view')
+def refine_view(relayout, dataset_id, color_by, dimension, point_size, opacity, highlight_category, similar_rows,
+                centroid_toggle, filters, last_bounds):
+    ds = datasets.get(dataset_id)
+    # Only datasets too large to send whole are resampled on zoom
+    if len(ds.data) <= LOD_MAX_POINTS or not relayout:
+        return no_update, no_update
+    bounds = view_bounds(ds, relayout, dimension)
+    # Rotating or panning at overview zoom while the overview is shown needs nothing new
+    if bounds is None or (not bounds and not last_bounds):
+        return no_update, no_update
+    filter_mask = filter_index(ds).mask(filters or {})
+    if not bounds:
+        base = figure_cache(ds).get((color_by, dimension))
+    else:
+        grid = lod_grid(ds, dimension)
+        in_view = grid.mask_in_bounds(bounds)
+        rows = grid.sample(LOD_MAX_POINTS, in_view if filter_mask is None else in_view & filter_mask)
+        base = build_base_figure(ds, color_by, dimension, data=ds.data.iloc[rows]).to_plotly_json()
+        # Already limited to the filtered rows
+        filter_mask = None
+    figure = style_figure(ds, base, color_by, dimension, point_size, opacity, highlight_category, similar_rows,
+                          bool(centroid_toggle), filter_mask)
+    return figure, bounds
 
 
 @callback(
     [Output('audio-player', 'src'),
      Output('audio-info', 'children'),
+     Output('spectrogram-viewer', 'src'),
      Output('image-viewer', 'src'),
+     Output('image-viewer', 'srcSet'),
      Output('image-info', 'children')],
-    [Input('3d-scatter', 'clickData')]
+    [Input('3d-scatter', 'clickData')],
+    [State('dataset-dropdown', 'value')]
 )
-def update_media(clickData):
+@timed('update_media')
+def update_media(clickData, dataset_id):
     if clickData is None:
-        return None, "Click a point to play audio", None, "Click a point to view spider plot"
+        return None, "Click a point to play audio", None, None, None, "Click a point to view spider plot"
 
     point = clickData['points'][0]
+    # Centroid markers carry no call
+    if not point.get('customdata'):
+        return (no_update,) * 6
     file_name = point['customdata'][3]
     has_audio = point['customdata'][4]
     has_image = point['customdata'][5]
 
     if has_audio:
-        audio_src = f"/segments/{file_name}"
+        audio_src = audio_url(dataset_id, file_name)
         audio_text = file_name
+        # Defaults of the precomputed spectrograms (spectrogram.py build), so this is a cache hit
+        spectrogram_src = f"{media_prefix(dataset_id)}/spectrogram/{file_name}"
     else:
         audio_src = None
         audio_text = f"No audio: {file_name}"
+        spectrogram_src = None
 
-    if has_image:
-        image_name = file_name.replace('.wav', '.png')
-        image_src = f"/images/{image_name}"
+    image_name = file_name.replace('.wav', '.png')
+    # Rated calls without a prebuilt plot get one drawn by serve_image
+    if has_image or image_name in spider_plot_ratings(datasets.get(dataset_id)):
+        image_src, image_srcset = image_sources(dataset_id, image_name)
         image_text = image_name
     else:
-        image_src = None
+        image_src, image_srcset = None, None
         image_text = f"No image: {file_name}"
 
-    return audio_src, audio_text, image_src, image_text
+    return audio_src, audio_text, spectrogram_src, image_src, image_srcset, image_text
+
+
+# --- Group Statistics ---
+GROUP_COLUMNS = [opt['value'] for opt in color_by_options]
+_cell_style = {'padding': '2px 4px', 'textAlign': 'right', 'whiteSpace': 'nowrap'}
+
+
+@callback(
+    Output('group-stats', 'children'),
+    [Input('dataset-dropdown', 'value'),
+     Input('color-dropdown', 'value'),
+     Input('dimension-dropdown', 'value')]
+)
+@timed('update_group_stats')
+def update_group_stats(dataset_id, color_by, dimension):
+    if not color_by:
+        return None
+    ds = datasets.get(dataset_id)
+    stats = group_stats(ds, color_by)
+    space = stats.spaces[f'umap_{dimension}']
+    nearest, nearest_distance = stats.nearest_group(f'umap_{dimension}')
+    colors = _color_map(ds, color_by)
+
+    header = html.Tr([html.Th(text, style=dict(_cell_style, color='#666', fontWeight='400'), title=title)
+                      for text, title in [('Group', None), ('n', 'Calls'),
+                                          ('Spread', 'RMS distance to the centroid (UMAP)'),
+                                          ('PC', 'RMS distance to the centroid (PC1..PC20)'),
+                                          ('Sep.', 'Silhouette-style separation (UMAP), -1 to 1'),
+                                          ('Nearest', 'Group with the closest centroid (UMAP)')]])
+    rows = [
+        html.Tr([
+            html.Td(group, style=dict(_cell_style, textAlign='left', color=colors.get(group, '#aaa'))),
+            html.Td(str(stats.counts[i]), style=_cell_style),
+            html.Td(f"{space['dispersion'][i]:.2f}", style=_cell_style),
+            html.Td(f"{stats.spaces['pc']['dispersion'][i]:.1f}", style=_cell_style),
+            html.Td('' if np.isnan(space['separation'][i]) else f"{space['separation'][i]:.2f}", style=_cell_style),
+            html.Td('' if len(stats) < 2 else f"{stats.groups[nearest[i]]} ({nearest_distance[i]:.1f})",
+                    style=dict(_cell_style, textAlign='left')),
+        ])
+        for i, group in enumerate(stats.groups)
+    ]
+    return html.Table([html.Thead(header), html.Tbody(rows)], style={'borderCollapse': 'collapse', 'width': '100%'})
+
+
+@server.route('/api/groups/<column>')
+@timed('api_groups', kind='route')
+def group_statistics(column):
+    """Per-group centroids, dispersion, separation and centroid distances of ``column`` in every space."""
+    ds = request_dataset()
+    if column not in GROUP_COLUMNS:
+        abort(404)
+    return jsonify({'dataset': ds.id, 'column': column, **group_stats(ds, column).to_dict()})
+
+
+# --- Similarity Search ---
+def similarity_index(ds):
+    """KD-tree over the dataset's features (PC1..PC20), built on first use so they stay out of startup."""
+    return ds.derived('similarity', lambda: SimilarityIndex(ds.load_columns(ds.features).to_numpy()))
+
+
+@server.route('/api/similar/<path:file_name>')
+@timed('api_similar', kind='route')
+def similar_calls(file_name):
+    """The ``k`` calls acoustically closest to ``file_name`` (Euclidean distance over PC1..PC20)."""
+    ds = request_dataset()
+    row = row_by_file(ds).get(file_name)
+    if row is None:
+        abort(404)
+    k = max(1, min(request.args.get('k', SIMILAR_K, type=int), 500))
+    rows, distances = similarity_index(ds).similar_to(row, k)
+    return jsonify({'file': file_name, 'dataset': ds.id, 'similar': [
+        {'file': ds.data['file'].iat[i], 'distance': float(d)} for i, d in zip(rows, distances)
+    ]})
+
+
+@callback(
+    [Output('3d-scatter', 'figure', allow_duplicate=True),
+     Output('similar-rows', 'data'),
+     Output('similar-info', 'children')],
+    [Input('similar-btn', 'n_clicks'),
+     Input('similar-clear-btn', 'n_clicks'),
+     Input('dataset-dropdown', 'value')],
+    [State('3d-scatter', 'clickData'),
+     State('color-dropdown', 'value'),
+     State('dimension-dropdown', 'value')],
+    prevent_initial_call=True
+)
+@timed('show_similar')
+def show_similar(similar_clicks, clear_clicks, dataset_id, clickData, color_by, dimension):
+    # update_plot redraws the figure of the new dataset without the overlay
+    if ctx.triggered_id == 'dataset-dropdown':
+        return no_update, [], ""
+
+    ds = datasets.get(dataset_id)
+    rows = []
+    info = ""
+    if ctx.triggered_id == 'similar-btn':
+        if clickData is None or not clickData['points'][0].get('customdata'):
+            return no_update, no_update, "Click a point first"
+        file_name = clickData['points'][0]['customdata'][3]
+        row = row_by_file(ds).get(file_name)
+        if row is None:
+            return no_update, no_update, "Click a point first"
+        rows = similarity_index(ds).similar_to(row, SIMILAR_K)[0].tolist()
+        info = f"{len(rows)} most similar to {file_name}"
+
+    # The overlay trace sits right after the color traces
+    patched = Patch()
+    for key, value in similar_trace_data(ds, rows, dimension).items():
+        patched['data'][len(trace_names(ds, color_by))][key] = value
+    return patched, rows, info
+
+
+# --- Selection and Export ---
+# CSV rows encoded per write of the export's calls.csv member
+EXPORT_CHUNK_ROWS = 10000
+_export_link_style = {
+    'display': 'block', 'padding': '5px 8px', 'fontSize': '11px', 'marginBottom': 16, 'textAlign': 'center',
+    'fontFamily': 'Space Grotesk, sans-serif', 'color': 'rgba(255,255,255,0.7)', 'textDecoration': 'none',
+    'border': '1px solid rgba(255,255,255,0.2)', 'borderRadius': '3px'
+}
+
+
+def selected_rows(ds, selected_data):
+    """Rows of ``ds`` in a box/lasso ``selectedData``; overlay points without a call are skipped."""
+    rows = row_by_file(ds)
+    selected = {rows.get(point['customdata'][3]) for point in (selected_data or {}).get('points', [])
+                if point.get('customdata')}
+    selected.discard(None)
+    return sorted(selected)
+
+
+def export_url(ds, rows=None, filters=None):
+    """Export URL of the selected ``rows`` (None: no selection) within the metadata ``filters``."""
+    url = f"/api/export?dataset={ds.id}"
+    if rows is not None:
+        url += f"&selection={encode_selection(rows, len(ds.data))}"
+    # The same query string as the page URL; the endpoint intersects it with the selection
+    return url + to_query(filters or {}).replace('?', '&', 1)
+
+
+@callback(
+    [Output('selection-info', 'children'),
+     Output('export-link', 'href'),
+     Output('export-link', 'style')],
+    [Input('3d-scatter', 'selectedData'),
+     Input('dataset-dropdown', 'value'),
+     Input('filters', 'data')]
+)
+@timed('update_selection')
+def update_selection(selected_data, dataset_id, filters):
+    ds = datasets.get(dataset_id)
+    rows = [] if ctx.triggered_id == 'dataset-dropdown' else selected_rows(ds, selected_data)
+    # The filters alone select calls too, so the 3D view (no box/lasso) can export
+    mask = filter_index(ds).mask(filters or {})
+    if not rows and mask is None:
+        return "Box or lasso select in the 2D view, or filter, to export calls", None, {'display': 'none'}
+    if rows:
+        selected = np.zeros(len(ds.data), dtype=bool)
+        selected[rows] = True
+        mask = selected if mask is None else mask & selected
+    count = int(mask.sum())
+    if not count:
+        return "No calls match the selection and filters", None, {'display': 'none'}
+    with_audio = int(ds.data['has_audio'].to_numpy()[mask].sum())
+    what = "selected" if rows else "match the filters"
+    return (f"{count} calls {what}, {with_audio} with audio", export_url(ds, rows or None, filters),
+            _export_link_style)
+
+
+def export_mask(ds, args):
+    """Rows to export as a boolean mask: the ``selection`` token and the metadata filters of ``args``.
+
+    ``ValueError`` for a malformed token; None when ``args`` selects nothing at all.
+    """
+    mask = None
+    if args.get('selection'):
+        mask = np.zeros(len(ds.data), dtype=bool)
+        mask[decode_selection(args['selection'], len(ds.data))] = True
+    matches = filter_index(ds).mask({column: args.getlist(column) for column in FILTER_COLUMNS})
+    if matches is not None:
+        mask = matches if mask is None else mask & matches
+    return mask
+
+
+def export_entries(ds, rows):
+    """Archive members for ``rows``: the CSV slice first, then each call's WAV and spider plot."""
+    # The dataset's own columns (PCs, ratings included), not the app's renamed subset,
+    # encoded a chunk of rows at a time as the archive is written
+    chunks = iter_rows(rows, EXPORT_CHUNK_ROWS, columns_dir=ds.columns_dir, csv_path=ds.csv_path)
+    yield 'calls.csv', (chunk.to_csv(index=False, header=i == 0).encode('utf-8') for i, chunk in enumerate(chunks))
+    files = ds.data['file'].to_numpy()
+    for file_name in files[rows]:
+        wav = find_media(file_name, ds.audio_dir) if ds.audio_dir else None
+        if wav:
+            yield f'audio/{file_name}', wav
+        image_name = file_name.replace('.wav', '.png')
+        image = (find_media(image_name, ds.image_dir) if ds.image_dir else None) or drawn_spider_plot(ds, image_name)
+        if image:
+            yield f'spider_plots/{image_name}', image
+
+
+@server.route('/api/export')
+@timed('api_export', kind='route')
+def export_calls():
+    """Zip of the selected calls' WAVs, spider plots and CSV rows, streamed as it is written.
+
+    Query: ``selection`` (token from export.encode_selection) and/or
+    metadata filters such as ``subject=Zamba``; both given means both apply.
+    """
+    ds = request_dataset()
+    try:
+        mask = export_mask(ds, request.args)
+    except ValueError as e:
+        abort(400, str(e))
+    if mask is None:
+        abort(400, 'select calls with selection= or a metadata filter')
+    rows = np.flatnonzero(mask)
+    response = Response(stream_with_context(stream_zip(export_entries(ds, rows))), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{ds.id}-{len(rows)}-calls.zip"'
+    return response
+
+
+# Warm the browser cache with nearby calls' media while hovering (assets/prefetch.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='prefetch', function_name='onHover'),
+    Output('prefetch-sink', 'data'),
+    Input('3d-scatter', 'hoverData'),
+    State('prefetch-config', 'data'),
+    State('dataset-dropdown', 'value'),
+    prevent_initial_call=True
+)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+/*
+ * Hover prefetch: warms the browser cache with the audio and spider plots of
+ * the calls nearest to the hovered point, so a later click plays instantly.
+ * Budgets come from the 'prefetch-config' store (PREFETCH_* env vars).
+ */
+(function () {
+    var seen = new Set();      // URLs already requested (or queued)
+    var hovered = new Set();   // dataset/file pairs whose neighbors were already looked up
+    var queue = [];
+    var inflight = 0;
+    var total = 0;
+    var timer = null;
+
+    function pump(config) {
+        while (inflight < config.maxInflight && queue.length && total < config.maxTotal) {
+            var job = queue.shift();
+            inflight += 1;
+            total += 1;
+            job().catch(function () {}).then(function () {
+                inflight -= 1;
+                pump(config);
+            });
+        }
+    }
+
+    function enqueue(url, job, config) {
+        if (!url || seen.has(url)) {
+            return;
+        }
+        seen.add(url);
+        queue.push(job);
+        pump(config);
+    }
+
+    function prefetchAudio(url) {
+        return function () {
+            return fetch(url, {priority: 'low', credentials: 'same-origin'})
+                .then(function (response) { return response.blob(); });
+        };
+    }
+
+    function prefetchImage(src, srcset, sizes) {
+        return function () {
+            return new Promise(function (resolve) {
+                // Same srcset/sizes as the viewer, so the browser fetches the variant it will show
+                var img = new Image();
+                img.onload = img.onerror = resolve;
+                if (srcset) {
+                    img.sizes = sizes;
+                    img.srcset = srcset;
+                }
+                img.src = src;
+            });
+        };
+    }
+
+    function lookup(file, dataset, config) {
+        var key = dataset + '/' + file;
+        if (hovered.has(key) || total >= config.maxTotal) {
+            return;
+        }
+        hovered.add(key);
+        fetch('/api/neighbors/' + encodeURIComponent(file) + '?k=' + config.k +
+              '&dataset=' + encodeURIComponent(dataset))
+            .then(function (response) { return response.ok ? response.json() : {neighbors: []}; })
+            .then(function (data) {
+                data.neighbors.forEach(function (n) {
+                    enqueue(n.audio, prefetchAudio(n.audio), config);
+                    enqueue(n.image, prefetchImage(n.image, n.imageSrcset, config.imageSizes), config);
+                });
+            })
+            .catch(function () {});
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        prefetch: {
+            onHover: function (hoverData, config, dataset) {
+                var noUpdate = window.dash_clientside.no_update;
+                if (!config || !config.enabled || !hoverData || !hoverData.points.length) {
+                    return noUpdate;
+                }
+                var customdata = hoverData.points[0].customdata;
+                if (!customdata) {
+                    return noUpdate;
+                }
+                clearTimeout(timer);
+                timer = setTimeout(function () { lookup(customdata[3], dataset, config); }, config.debounceMs);
+                return noUpdate;
+            }
+        }
+    });
+})();
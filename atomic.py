@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Atomic file writes, shared by the caches and the build scripts.
+
+Data goes to a temporary file in the destination directory, then
+``os.replace`` swaps it in, so concurrent readers (other gunicorn workers,
+the app while a build runs) see the old file or the new one, never a
+partial one.
+"""
+
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """Replace ``path`` with ``data`` (bytes, or str written as UTF-8), creating its directory.
+
+    ``OSError`` on failure, with the temporary file removed; callers for
+    which the write is optional (caches) catch it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,147 @@
+"""
+Microbenchmarks of the Dash callbacks and media routes, called in-process.
+
+update_plot runs for every color-dropdown value and view: the color change
+(full figure from the figure cache) and then every size/opacity slider
+combination, highlight value and centroid toggle (patches).
+update_group_stats switches through every grouping, first computing then
+from the per-column cache. update_media replays clicks on random points;
+/segments and /images go through the Flask test client, so send_file,
+ETags and headers are included, and /api/export zips the clicked rows.
+Results are written as a JSON report comparable with benchmarks/compare.py.
+
+    python benchmarks/callbacks.py [--repeat 5] [--clicks 200] [--output report.json]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from benchmarks.common import print_results, run_callback, summarize, write_report  # noqa: E402
+
+SIZES = list(range(1, 12, 2))
+OPACITIES = [0.3, 0.5, 0.7, 1.0]
+
+
+def _measure(calls, payload):
+    """Latencies and payload sizes of ``calls`` (zero-argument functions)."""
+    latencies, nbytes = [], []
+    for call in calls:
+        start = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - start)
+        nbytes.append(payload(result))
+    return latencies, nbytes
+
+
+def _figure_bytes(response):
+    return len(pio.to_json(response[0], validate=False))
+
+
+def bench_update_plot(ds, repeat):
+    results = []
+    highlights = ['All'] + [c for c in app.refined_category_order
+                            if c in ds.data['valence_arousal_refined'].values]
+    for option in app.color_by_options:
+        color_by = option['value']
+        for dim in app.dimension_options:
+            dimension = dim['value']
+            prefix = f'update_plot {color_by}/{dimension}'
+
+            def color(color_by=color_by, dimension=dimension):
+                return run_callback(app.update_plot, 'color-dropdown.value',
+                                    ds.id, color_by, dimension, 3, 1.0, 'All', [], {}, [], None)
+            results.append(summarize(f'{prefix} color', *_measure([color] * repeat, _figure_bytes)))
+
+            calls = []
+            for size in SIZES:
+                for opacity in OPACITIES:
+                    for trigger in ('size-slider.value', 'opacity-slider.value'):
+                        calls.append(lambda t=trigger, s=size, o=opacity, c=color_by, d=dimension:
+                                     run_callback(app.update_plot, t, ds.id, c, d, s, o, 'All', [], {}, [], None))
+            results.append(summarize(f'{prefix} sliders', *_measure(calls * repeat, _figure_bytes)))
+
+            if color_by == 'valence_arousal_refined':
+                calls = [lambda h=h, d=dimension: run_callback(app.update_plot, 'category-highlight.value', ds.id,
+                                                               'valence_arousal_refined', d, 3, 1.0, h, [], {}, [], None)
+                         for h in highlights]
+                results.append(summarize(f'{prefix} highlight', *_measure(calls * repeat, _figure_bytes)))
+
+            calls = [lambda v=v, c=color_by, d=dimension: run_callback(app.update_plot, 'centroid-toggle.value', ds.id,
+                                                                       c, d, 3, 1.0, 'All', v, {}, [], None)
+                     for v in (['show'], [])]
+            results.append(summarize(f'{prefix} centroids', *_measure(calls * repeat, _figure_bytes)))
+    return results
+
+
+def bench_group_stats(ds, repeat):
+    """Switching the grouping of the statistics panel; the first pass per column computes the aggregates."""
+    calls = [lambda c=option['value']: run_callback(app.update_group_stats, 'color-dropdown.value', ds.id, c, '3d')
+             for option in app.color_by_options]
+    latencies, nbytes = _measure(calls, lambda response: len(str(response)))
+    results = [summarize('update_group_stats first', latencies, nbytes)]
+    latencies, nbytes = _measure(calls * repeat, lambda response: len(str(response)))
+    results.append(summarize('update_group_stats cached', latencies, nbytes))
+    return results
+
+
+def bench_update_media(ds, rows):
+    def click(row):
+        record = ds.data.iloc[row]
+        return {'points': [{'customdata': [record[c] for c in app.CUSTOM_COLS]}]}
+
+    calls = [lambda c=click(row): app.update_media(c, ds.id) for row in rows]
+    return [summarize('update_media', *_measure(calls, lambda response: len(str(response))))]
+
+
+def bench_routes(ds, rows):
+    client = app.server.test_client()
+    files = ds.data['file'].to_numpy()
+    has_audio = ds.data['has_audio'].to_numpy(dtype=bool)
+    has_image = ds.data['has_image'].to_numpy(dtype=bool)
+    audio_urls = [app.audio_url(ds.id, files[r]) for r in rows if has_audio[r]]
+    image_urls = [app.image_sources(ds.id, files[r].replace('.wav', '.png'))[0] for r in rows if has_image[r]]
+
+    results = []
+    for name, urls in (('GET /segments', audio_urls), ('GET /images', image_urls)):
+        if not urls:
+            continue
+        calls = [lambda u=u: client.get(u) for u in urls]
+        latencies, nbytes = _measure(calls, lambda response: len(response.get_data()))
+        results.append(summarize(name, latencies, nbytes))
+
+    # The whole zip is streamed and read back, so this is the full export time of the clicked rows
+    export = app.export_url(ds, sorted(rows))
+    latencies, nbytes = _measure([lambda: client.get(export)], lambda response: len(response.get_data()))
+    results.append(summarize('GET /api/export', latencies, nbytes))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='passes over every update_plot combination')
+    parser.add_argument('--clicks', type=int, default=200, help='random points for update_media and the routes')
+    parser.add_argument('--dataset', help='registered dataset id (default: the default dataset)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='report path (default .cache/bench/callbacks-<commit>.json)')
+    args = parser.parse_args()
+
+    ds = app.datasets.get(args.dataset)
+    rows = np.random.default_rng(args.seed).choice(len(ds.data), size=min(args.clicks, len(ds.data)), replace=False)
+    # Group statistics first, before the centroid toggles of update_plot fill their cache
+    results = (bench_group_stats(ds, args.repeat) + bench_update_plot(ds, args.repeat) + bench_update_media(ds, rows)
+               + bench_routes(ds, rows))
+    print_results(results)
+    path = write_report('callbacks', results, args.output, dataset=ds.id, repeat=args.repeat, clicks=args.clicks,
+                        seed=args.seed)
+    print(f'report: {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Shared helpers for the JSON-reporting benchmarks (callbacks.py, load.py, compare.py).
+
+A report is a JSON document with a ``meta`` block (commit, host, settings)
+and a list of ``results``, one per scenario, each holding latency
+percentiles in milliseconds, throughput and response bytes.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextvars import copy_context
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(ROOT, '.cache', 'bench')
+
+
+def run_callback(fn, prop_id, *args):
+    """Call a Dash callback outside a request, with ``prop_id`` as the triggering input."""
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    def run():
+        context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': None}]))
+        return fn(*args)
+    return copy_context().run(run)
+
+
+def summarize(name, latencies, nbytes, elapsed=None, errors=0, **extra):
+    """One report entry from per-request latencies (seconds) and response sizes (bytes)."""
+    latencies = np.asarray(latencies, dtype=np.float64) * 1e3
+    nbytes = np.asarray(nbytes, dtype=np.int64)
+    if elapsed is None:
+        elapsed = latencies.sum() / 1e3
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (float('nan'),) * 3
+    return dict(
+        name=name,
+        requests=int(len(latencies)),
+        errors=int(errors),
+        p50_ms=round(float(p50), 3),
+        p95_ms=round(float(p95), 3),
+        p99_ms=round(float(p99), 3),
+        mean_ms=round(float(latencies.mean()), 3) if len(latencies) else float('nan'),
+        throughput_rps=round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        mean_bytes=int(nbytes.mean()) if len(nbytes) else 0,
+        total_bytes=int(nbytes.sum()),
+        **extra,
+    )
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return out.stdout.strip()
+
+
+def write_report(kind, results, path=None, **settings):
+    """Write ``results`` as a report, by default to .cache/bench/<kind>-<commit>.json."""
+    commit = git_commit()
+    report = {
+        'meta': {
+            'kind': kind,
+            'commit': commit,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'settings': settings,
+        },
+        'results': results,
+    }
+    if path is None:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f'{kind}-{commit}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_results(results):
+    print(f"{'scenario':<50}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'KB':>9}")
+    for r in results:
+        print(f"{r['name']:<50}{r['requests']:>6}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['throughput_rps']:>9.1f}{r['mean_bytes'] / 1024:>9.1f}")
@@ -0,0 +1,64 @@
+"""
+Compare two benchmark reports (callbacks.py or load.py) scenario by scenario.
+
+Prints the relative change of p50/p95/p99 and throughput, and exits with
+status 1 when any p95 regresses by more than --threshold (default 20%)
+and by more than --min-ms, so sub-millisecond noise does not fail the
+comparison. This lets it gate a change before a deploy.
+
+    python benchmarks/compare.py BASELINE.json CANDIDATE.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return report['meta'], {r['name']: r for r in report['results']}
+
+
+def _change(before, after):
+    if not before:
+        return float('nan')
+    return (after - before) / before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative p95 increase')
+    parser.add_argument('--min-ms', type=float, default=0.5, help='ignore p95 increases smaller than this')
+    args = parser.parse_args()
+
+    base_meta, baseline = _load(args.baseline)
+    cand_meta, candidate = _load(args.candidate)
+    if base_meta['kind'] != cand_meta['kind']:
+        parser.error(f"cannot compare a {base_meta['kind']} report with a {cand_meta['kind']} report")
+    print(f"{base_meta['kind']}: {base_meta['commit']} -> {cand_meta['commit']}")
+
+    print(f"{'scenario':<50}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'bytes':>9}")
+    regressions = []
+    for name, before in baseline.items():
+        after = candidate.get(name)
+        if after is None:
+            print(f'{name:<50}  (missing from candidate)')
+            continue
+        changes = [_change(before[k], after[k]) for k in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps',
+                                                          'mean_bytes')]
+        print(f'{name:<50}' + ''.join(f'{c:>+9.1%}' for c in changes))
+        if changes[1] > args.threshold and after['p95_ms'] - before['p95_ms'] > args.min_ms:
+            regressions.append(name)
+    for name in candidate.keys() - baseline.keys():
+        print(f'{name:<50}  (new in candidate)')
+
+    if regressions:
+        print(f'\np95 regressed by more than {args.threshold:.0%} in: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Startup time and RSS of loading the dataset: full CSV parse vs the columnar artifact.
+
+Each mode runs in a fresh interpreter so timings and RSS are not shared
+(Linux only, RSS is read from /proc). Build the artifact first with ``python dataset.py build``.
+
+    python benchmarks/dataset_load.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Current (not peak) RSS from /proc, so the imports before loading don't mask it
+SNIPPET = '''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from dataset import CSV_PATH, load_columns
+columns = {columns!r}
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+base_rss = rss()
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss_bytes": rss() - base_rss}}))
+'''
+
+MODES = {
+    'csv (all columns)': "df = pd.read_csv(CSV_PATH)",
+    'csv (usecols)': "df = pd.read_csv(CSV_PATH, usecols=columns)",
+    'npy mmap (app columns)': "df = load_columns(columns)",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['FIGURE_CACHE_WARM'] = '0'
+    sys.path.insert(0, ROOT)
+    from app import APP_COLUMNS
+
+    print(f"{'mode':<26}{'median ms':>11}{'rss MB':>9}")
+    for name, load in MODES.items():
+        code = SNIPPET.format(root=ROOT, columns=APP_COLUMNS, load=load)
+        runs = [json.loads(subprocess.run([sys.executable, '-c', code], check=True,
+                                          capture_output=True, text=True).stdout)
+                for _ in range(args.repeat)]
+        seconds = statistics.median(r['seconds'] for r in runs)
+        rss_mb = statistics.median(r['rss_bytes'] for r in runs) / 2 ** 20
+        print(f"{name:<26}{seconds * 1e3:>11.1f}{rss_mb:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
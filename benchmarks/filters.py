@@ -0,0 +1,137 @@
+"""
+Metadata filter latency: per-value mask indexes vs pandas ``isin``, and the figure update they drive.
+
+Random combinations of the panel's filters (1 to 5 columns, 1 to 3 values
+each) are applied to the real dataset, then to synthetic ones resampled
+from its rows, with FilterIndex.mask and with the ``isin`` comparisons the
+export endpoint used before. On the real dataset, the same combinations
+also go through sync_filters (what a dropdown change runs) and the
+update_plot filter patch, next to a full figure rebuild with
+build_base_figure for reference; both timings include the JSON encoding
+of the response. Results are written as a JSON report comparable with
+benchmarks/compare.py.
+
+    python benchmarks/filters.py [--sizes 100000 1000000] [--combinations 200] [--output report.json]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from benchmarks.common import print_results, run_callback, summarize, write_report  # noqa: E402
+from filters import FilterIndex, to_query  # noqa: E402
+
+
+def random_filters(index, rng, n):
+    """``n`` random filter states over the panel's columns."""
+    columns = list(app.FILTER_CONTROLS)
+    states = []
+    for _ in range(n):
+        state = {}
+        for column in rng.choice(columns, size=rng.integers(1, len(columns) + 1), replace=False):
+            values = [value for value, _ in index.values(column)]
+            state[column] = sorted(rng.choice(values, size=min(len(values), rng.integers(1, 4)), replace=False).tolist())
+        states.append(state)
+    return states
+
+
+def isin_mask(data, filters):
+    """The filter as ``isin`` comparisons over the data, as export_mask did before the index."""
+    mask = None
+    for column, values in filters.items():
+        if data[column].dtype == bool:
+            values = [value == 'True' for value in values]
+        matches = data[column].isin(values).to_numpy()
+        mask = matches if mask is None else mask & matches
+    return mask
+
+
+def _latencies(fn, states):
+    latencies = []
+    for state in states:
+        start = time.perf_counter()
+        fn(state)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_masks(data, states, label):
+    start = time.perf_counter()
+    index = FilterIndex(data, app.FILTER_COLUMNS)
+    build = time.perf_counter() - start
+    for state in states[:20]:
+        assert np.array_equal(index.mask(state), isin_mask(data, state))
+    zeros = np.zeros(len(states))
+    return [
+        summarize(f'index build {label}', [build], [0]),
+        summarize(f'mask {label} index', _latencies(index.mask, states), zeros),
+        summarize(f'mask {label} isin', _latencies(lambda s: isin_mask(data, s), states), zeros),
+    ]
+
+
+def bench_callbacks(ds, states):
+    results = []
+    matches = [int(app.filter_index(ds).mask(state).sum()) for state in states]
+    print(f'matching calls per combination: median {int(np.median(matches))}, max {max(matches)} of {len(ds.data)}')
+
+    def sync(state):
+        values = [state.get(column, []) for column in app.FILTER_CONTROLS]
+        return run_callback(app.sync_filters, 'filter-subject.value', to_query(state), ds.id, *values, {})
+    results.append(summarize('sync_filters', _latencies(sync, states), np.zeros(len(states))))
+
+    for dimension in ('3d', '2d'):
+        color_by = 'valence_arousal_refined'
+        key = [ds.id, color_by, dimension]
+        nbytes = []
+
+        def patch(state):
+            response = run_callback(app.update_plot, 'filters.data', ds.id, color_by, dimension, 3, 1.0, 'All', [],
+                                    state, [], key)
+            nbytes.append(len(pio.to_json(response[0], validate=False)))
+        latencies = _latencies(patch, states)
+        results.append(summarize(f'update_plot {dimension} filter patch', latencies, nbytes))
+
+        nbytes = []
+
+        def rebuild(state):
+            data = ds.data[app.filter_index(ds).mask(state)]
+            nbytes.append(len(pio.to_json(app.build_base_figure(ds, color_by, dimension, data=data), validate=False)))
+        # A px figure build per combination: the cost of filtering by rebuilding instead of patching
+        latencies = _latencies(rebuild, states[:20])
+        results.append(summarize(f'build_base_figure {dimension} filtered', latencies, nbytes))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help='rows of the synthetic datasets resampled from the real one')
+    parser.add_argument('--combinations', type=int, default=200, help='random filter states per dataset')
+    parser.add_argument('--dataset', help='registered dataset id (default: the default dataset)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='report path (default .cache/bench/filters-<commit>.json)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ds = app.datasets.get(args.dataset)
+    states = random_filters(app.filter_index(ds), rng, args.combinations)
+
+    results = bench_masks(ds.data, states, len(ds.data))
+    for n in args.sizes:
+        data = ds.data.iloc[rng.integers(0, len(ds.data), n)].reset_index(drop=True)
+        results += bench_masks(data, states, n)
+    results += bench_callbacks(ds, states)
+    print_results(results)
+    path = write_report('filters', results, args.output, dataset=ds.id, sizes=args.sizes,
+                        combinations=args.combinations, seed=args.seed)
+    print(f'report: {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+HTTP load test of a local gunicorn ``app:server`` at rising concurrency.
+
+Starts gunicorn on a free local port (or targets --url), then for every
+concurrency level runs each scenario for --duration seconds with one
+keep-alive connection per client thread:
+
+    dash    POST /_dash-update-component: slider patches and color changes
+    audio   GET /segments/<file> for random calls with audio
+    image   GET /images/<file> for random spider plots, at the src the viewer uses
+    mixed   dash clients while as many slow clients download the original
+            WAVs at --media-rate KB/s: callback latency under media load
+
+gunicorn runs with gunicorn.conf.py; --worker-class, --workers and
+--threads override its defaults, so worker settings can be compared.
+
+The load generator runs on the same machine as the server, so absolute
+numbers are only comparable between runs on the same host.
+
+    python benchmarks/load.py [--concurrency 1 4 16] [--duration 10] [--scenarios dash audio image mixed]
+                              [--worker-class gthread] [--workers 2] [--threads 8] [--output report.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The server gets the environment as given; the client only needs app for its URL helpers
+SERVER_ENV = dict(os.environ)
+os.environ.setdefault('FIGURE_CACHE_WARM', '0')
+import app  # noqa: E402
+from benchmarks.common import ROOT, print_results, summarize, write_report  # noqa: E402
+
+PLOT_OUTPUTS = [{'id': '3d-scatter', 'property': 'figure'},
+                {'id': 'category-highlight-container', 'property': 'style'},
+                {'id': 'category-highlight', 'property': 'options'},
+                {'id': 'plot-key', 'property': 'data'}]
+COLORS = ['valence_arousal_refined', 'subject', 'context_complet', 'age_class']
+
+
+def _update_plot_body(trigger, color_by, size, opacity):
+    values = {'dataset-dropdown': app.datasets.default, 'color-dropdown': color_by, 'dimension-dropdown': '3d', 'size-slider': size,
+              'opacity-slider': opacity, 'category-highlight': 'All', 'centroid-toggle': []}
+    return json.dumps({
+        'output': '..' + '...'.join(f"{o['id']}.{o['property']}" for o in PLOT_OUTPUTS) + '..',
+        'outputs': PLOT_OUTPUTS,
+        'inputs': [{'id': k, 'property': 'value', 'value': v} for k, v in values.items()]
+        + [{'id': 'filters', 'property': 'data', 'value': {}}],
+        'state': [{'id': 'similar-rows', 'property': 'data', 'value': []},
+                  {'id': 'plot-key', 'property': 'data', 'value': None}],
+        'changedPropIds': [f'{trigger}.value'],
+    })
+
+
+def build_scenarios(seed):
+    """Request pools per scenario: lists of (method, path, body)."""
+    rng = random.Random(seed)
+    ds = app.datasets.get()
+    files = ds.data['file'].tolist()
+    audio = [f for f, has in zip(files, ds.data['has_audio'].astype(bool)) if has]
+    images = [f for f, has in zip(files, ds.data['has_image'].astype(bool)) if has]
+
+    dash = [('POST', '/_dash-update-component', _update_plot_body('color-dropdown', c, 3, 1.0)) for c in COLORS]
+    dash += [('POST', '/_dash-update-component', _update_plot_body(trigger, rng.choice(COLORS),
+                                                                   rng.randrange(1, 12, 2), rng.choice([0.3, 0.6, 1.0])))
+             for trigger in ('size-slider', 'opacity-slider') for _ in range(20)]
+    return {
+        'dash': dash,
+        'audio': [('GET', urllib.parse.quote(app.audio_url(ds.id, f)), None) for f in rng.sample(audio, min(200, len(audio)))],
+        'image': [('GET', urllib.parse.quote(app.image_sources(ds.id, f.replace('.wav', '.png'))[0]), None)
+                  for f in rng.sample(images, min(200, len(images)))],
+        'wav': [('GET', '/segments/' + urllib.parse.quote(f), None) for f in audio],
+    }
+
+
+def _read(response, rate):
+    """Read the whole body, at most ``rate`` bytes/s when given (a slow client)."""
+    if not rate:
+        return response.read()
+    size = 0
+    chunk_size = 16384
+    start = time.perf_counter()
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            return b'\0' * size
+        size += len(chunk)
+        time.sleep(max(0.0, size / rate - (time.perf_counter() - start)))
+
+
+def _client(host, port, pool, deadline, seed, rate=None):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    latencies, nbytes, errors = [], [], 0
+    while time.perf_counter() < deadline:
+        method, path, body = rng.choice(pool)
+        headers = {'Content-Type': 'application/json'} if body else {}
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = _read(response, rate)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        if response.status >= 400:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        nbytes.append(len(payload))
+    conn.close()
+    return latencies, nbytes, errors
+
+
+def _summarize_clients(name, parts, elapsed, **extra):
+    latencies = [x for p in parts for x in p[0]]
+    nbytes = [x for p in parts for x in p[1]]
+    errors = sum(p[2] for p in parts)
+    return summarize(name, latencies, nbytes, elapsed=elapsed, errors=errors, **extra)
+
+
+def run_level(host, port, name, pool, concurrency, duration):
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        parts = list(executor.map(lambda i: _client(host, port, pool, deadline, i), range(concurrency)))
+    return [_summarize_clients(f'{name} c={concurrency}', parts, time.perf_counter() - start,
+                               scenario=name, concurrency=concurrency)]
+
+
+def run_mixed(host, port, pools, concurrency, duration, media_rate):
+    """``concurrency`` dash clients alongside as many throttled WAV downloads."""
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2 * concurrency) as executor:
+        media = [executor.submit(_client, host, port, pools['wav'], deadline, 1000 + i, media_rate)
+                 for i in range(concurrency)]
+        dash = [executor.submit(_client, host, port, pools['dash'], deadline, i) for i in range(concurrency)]
+        # Slow downloads drain well past the deadline: time each group on its own
+        dash = [f.result() for f in dash]
+        dash_elapsed = time.perf_counter() - start
+        media = [f.result() for f in media]
+        media_elapsed = time.perf_counter() - start
+    return [_summarize_clients(f'mixed dash c={concurrency}', dash, dash_elapsed,
+                               scenario='mixed', concurrency=concurrency),
+            _summarize_clients(f'mixed wav c={concurrency}', media, media_elapsed,
+                               scenario='mixed', concurrency=concurrency)]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, worker_class, workers, threads, timeout=300):
+    """Start gunicorn with gunicorn.conf.py in the background and wait until it answers."""
+    # Overrides go through the config's env vars so the config derives threads from the worker class
+    overrides = {'GUNICORN_WORKER_CLASS': worker_class, 'WEB_CONCURRENCY': workers, 'GUNICORN_THREADS': threads}
+    env = dict(SERVER_ENV, **{k: str(v) for k, v in overrides.items() if v})
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:server', '-c', 'gunicorn.conf.py',
+                             '--bind', f'127.0.0.1:{port}'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {proc.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/_dash-layout')
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not start in time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='target a running server instead of starting gunicorn')
+    parser.add_argument('--worker-class', help='override GUNICORN_WORKER_CLASS (sync, gthread, gevent)')
+    parser.add_argument('--workers', type=int, help='override WEB_CONCURRENCY')
+    parser.add_argument('--threads', type=int, help='override GUNICORN_THREADS')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario and level')
+    parser.add_argument('--scenarios', nargs='+', default=['dash', 'audio', 'image'])
+    parser.add_argument('--media-rate', type=float, default=256, help='KB/s per slow client in the mixed scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='report path (default .cache/bench/load-<commit>.json)')
+    args = parser.parse_args()
+
+    pools = build_scenarios(args.seed)
+    proc = None
+    if args.url:
+        target = urllib.parse.urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = '127.0.0.1', _free_port()
+        proc = start_server(port, args.worker_class, args.workers, args.threads)
+
+    results = []
+    try:
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                if name == 'mixed':
+                    results += run_mixed(host, port, pools, concurrency, args.duration, args.media_rate * 1024)
+                else:
+                    results += run_level(host, port, name, pools[name], concurrency, args.duration)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print_results(results)
+    path = write_report('load', results, args.output, url=args.url, worker_class=args.worker_class,
+                        workers=args.workers, threads=args.threads, media_rate=args.media_rate, concurrency=args.concurrency, duration=args.duration, seed=args.seed)
+    print(f'report: {path}')
+
+
+if __name__ == '__main__':
+    main()
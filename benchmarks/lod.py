@@ -0,0 +1,60 @@
+"""
+Level-of-detail engine on synthetic data: index build, sampling latency and payload size.
+
+Synthetic datasets resample vis_data rows with jittered UMAP coordinates.
+The payload column is the serialized figure the browser would receive, which
+stays bounded by LOD_MAX_POINTS whatever the dataset size.
+
+    python benchmarks/lod.py [--sizes 10000 100000 1000000] [--budget 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_WARM', '0')
+import app  # noqa: E402
+from lod import VoxelGrid  # noqa: E402
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1e3, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--budget', type=int, default=app.LOD_MAX_POINTS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ds = app.datasets.get()
+    columns = app.DIMENSION_COLUMNS['3d']
+    print(f"{'rows':>9}{'index ms':>10}{'overview ms':>13}{'zoom ms':>9}{'points':>8}{'payload MB':>12}")
+    for n in args.sizes:
+        data = ds.data.iloc[rng.integers(0, len(ds.data), n)].reset_index(drop=True)
+        coords = data[columns].to_numpy() + rng.normal(0, 0.05, (n, len(columns)))
+        data[columns] = coords
+
+        index_ms, grid = _ms(lambda: VoxelGrid(coords))
+        overview_ms, rows = _ms(lambda: grid.sample(args.budget))
+        # Zoom into the central quarter of each axis
+        center, quarter = (grid.lo + grid.hi) / 2, (grid.hi - grid.lo) / 8
+        zoom_ms, _ = _ms(lambda: grid.sample(args.budget, grid.mask_in_bounds(
+            [(c - q, c + q) for c, q in zip(center, quarter)])))
+
+        fig = app.build_base_figure(ds, 'valence_arousal_refined', '3d', data=data.iloc[rows])
+        payload = pio.to_json(fig, validate=False)
+        print(f"{n:>9}{index_ms:>10.1f}{overview_ms:>13.1f}{zoom_ms:>9.1f}{len(rows):>8}"
+              f"{len(payload) / 2 ** 20:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Payload size and latency of the scatter callback per interaction.
+
+Compares the uncached px figure rebuild every interaction used to trigger
+against the response update_plot sends now (a Patch for slider/highlight
+changes, a figure from the figure cache for color changes).
+
+    python benchmarks/plot_payload.py [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from benchmarks.common import run_callback  # noqa: E402
+
+INTERACTIONS = [
+    ('color-dropdown', 'value', 'subject'),
+    ('size-slider', 'value', 7),
+    ('opacity-slider', 'value', 0.5),
+    ('category-highlight', 'value', 'positive_high'),
+]
+
+DEFAULTS = {
+    'color-dropdown': 'valence_arousal_refined',
+    'size-slider': 3,
+    'opacity-slider': 1.0,
+    'category-highlight': 'All',
+}
+
+
+def _time(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'interaction':<22}{'before ms':>11}{'before KB':>11}{'after ms':>10}{'after KB':>10}")
+    for component_id, prop, value in INTERACTIONS:
+        state = dict(DEFAULTS, **{component_id: value})
+        if component_id == 'category-highlight':
+            state['color-dropdown'] = 'valence_arousal_refined'
+
+        def before():
+            fig = app.build_base_figure(app.datasets.get(), state['color-dropdown'], '3d')
+            return pio.to_json(fig, validate=False)
+
+        def after():
+            response = run_callback(app.update_plot, f'{component_id}.{prop}', app.datasets.default,
+                                    state['color-dropdown'], '3d', state['size-slider'], state['opacity-slider'],
+                                    state['category-highlight'], [], {}, [], None)
+            return pio.to_json(response[0], validate=False)
+
+        before_s, before_json = _time(before, args.repeat)
+        after_s, after_json = _time(after, args.repeat)
+        print(f"{component_id:<22}{before_s * 1e3:>11.1f}{len(before_json) / 1024:>11.1f}"
+              f"{after_s * 1e3:>10.1f}{len(after_json) / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+3D vs 2D (WebGL) view: server build time, payload, and browser FPS / time-to-interactive.
+
+Server-side numbers are printed directly. Browser numbers need a real GPU
+and browser, so the script also writes one self-measuring HTML page per
+mode and size to .cache/bench/; open them and read the result banner (also
+logged to the console as JSON). Each page records time-to-interactive
+(navigation start to first render) and the frame rate of 120 programmatic
+camera orbits (3D) or pans (2D).
+
+    python benchmarks/render_modes.py [--sizes 100000] [--no-html]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.io as pio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('FIGURE_CACHE_WARM', '0')
+import app  # noqa: E402
+
+HARNESS = '''
+var gd = document.getElementById('{plot_id}');
+var tti = performance.now();
+var frames = 120, i = 0, start = performance.now();
+var is3d = gd.data[0].type === 'scatter3d';
+var x0 = gd.layout.xaxis && gd.layout.xaxis.range;
+function step() {
+    var t = i / frames * 2 * Math.PI;
+    var update = is3d
+        ? {'scene.camera.eye': {x: 1.8 * Math.cos(t), y: 1.8 * Math.sin(t), z: 1.8}}
+        : {'xaxis.range': [x0[0] + Math.sin(t), x0[1] + Math.sin(t)]};
+    Plotly.relayout(gd, update).then(function () {
+        i += 1;
+        if (i < frames) { requestAnimationFrame(step); return; }
+        var fps = frames / ((performance.now() - start) / 1000);
+        var result = {mode: is3d ? '3d' : '2d', points: POINTS, tti_ms: Math.round(tti), fps: +fps.toFixed(1)};
+        console.log(JSON.stringify(result));
+        var banner = document.createElement('pre');
+        banner.style.cssText = 'position:fixed;top:0;left:0;background:#fff;color:#000;padding:6px;z-index:9';
+        banner.textContent = JSON.stringify(result);
+        document.body.appendChild(banner);
+    });
+}
+requestAnimationFrame(step);
+'''
+
+
+def synthetic(ds, n, rng):
+    """``n`` rows resampled from ``ds`` with jittered embedding coordinates."""
+    data = ds.data.iloc[rng.integers(0, len(ds.data), n)].reset_index(drop=True)
+    for columns in app.DIMENSION_COLUMNS.values():
+        for column in columns:
+            data[column] = data[column].to_numpy() + rng.normal(0, 0.05, n)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--no-html', action='store_true', help='skip writing the browser pages')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ds = app.datasets.get()
+    out_dir = os.path.join(ROOT, '.cache', 'bench')
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"{'mode':<6}{'points':>9}{'build ms':>10}{'payload MB':>12}")
+    for n in [len(ds.data)] + args.sizes:
+        data = ds.data if n == len(ds.data) else synthetic(ds, n, rng)
+        for dimension in ('3d', '2d'):
+            start = time.perf_counter()
+            fig = app.build_base_figure(ds, 'valence_arousal_refined', dimension, data=data)
+            payload = pio.to_json(fig, validate=False)
+            build_ms = (time.perf_counter() - start) * 1e3
+            print(f"{dimension:<6}{n:>9}{build_ms:>10.0f}{len(payload) / 2 ** 20:>12.2f}")
+            if not args.no_html:
+                fig.write_html(os.path.join(out_dir, f'render_{dimension}_{n}.html'),
+                               include_plotlyjs='cdn', post_script=HARNESS.replace('POINTS', str(n)))
+
+    if not args.no_html:
+        print(f"Browser pages written to {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
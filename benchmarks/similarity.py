@@ -0,0 +1,60 @@
+"""
+Similarity search latency: KD-tree index vs brute-force NumPy over PC1..PC20.
+
+Uses the real PCs at today's size, then synthetic sets resampled from them
+(with small jitter) so the intrinsic structure of the data is kept.
+
+    python benchmarks/similarity.py [--sizes 10000 100000] [--queries 200] [--k 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset import load_columns  # noqa: E402
+from similarity import PC_COLUMNS, SimilarityIndex  # noqa: E402
+
+
+def _per_query_us(fn, queries, k):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q, k)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    real = load_columns(PC_COLUMNS).to_numpy(dtype=np.float64)
+    scale = real.std(axis=0) * 0.05
+
+    print(f"{'rows':>9}{'build ms':>10}{'tree us/q':>11}{'brute us/q':>12}")
+    for n in [len(real)] + args.sizes:
+        if n == len(real):
+            features = real
+        else:
+            features = real[rng.integers(0, len(real), n)] + rng.normal(0, 1, (n, real.shape[1])) * scale
+        start = time.perf_counter()
+        index = SimilarityIndex(features)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        queries = features[rng.integers(0, n, args.queries)]
+        tree_rows = [index.query(q, args.k)[0] for q in queries[:10]]
+        brute_rows = [index.brute_force(q, args.k)[0] for q in queries[:10]]
+        assert all(np.array_equal(a, b) for a, b in zip(tree_rows, brute_rows))
+
+        print(f"{n:>9}{build_ms:>10.1f}{_per_query_us(index.query, queries, args.k):>11.1f}"
+              f"{_per_query_us(index.brute_force, queries, args.k):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
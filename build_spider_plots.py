@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Spider plots of the per-call valence/arousal ratings.
+
+    python build_spider_plots.py [--dataset ID] [--workers 4] [--force]
+
+Draws spider_plots/<stem>.png for every row with ratings from
+negative_high, negative_low, positive_high and positive_low (percentages
+of the listeners' votes), in the layout of the original plots: one axis
+per category, 0-100 grid, labels in the category colors. ``total`` is
+noted in the corner when nonzero.
+
+Only rows with ratings get a plot: the others have NaN in all four
+columns. A plot is redrawn only when its ratings changed; the key of each
+generated PNG is kept in .spider_plots.json next to them, and existing PNGs
+without a key (the original ones) are kept unless --force. The
+``has_image`` column is then set from the PNGs on disk and the CSV and
+its columnar artifact rewritten if that changed anything.
+
+Run build_thumbnails.py afterwards for the WebP variants. The app also
+draws a missing plot on its first request (see serve_image).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+from atomic import write_atomic
+from dataset import write_csv
+from registry import DatasetRegistry
+
+RATING_COLUMNS = ['positive_high', 'negative_low', 'negative_high', 'positive_low']
+# Clockwise from the top, as in the original plots: (column, label, color of color_map_refined)
+AXES = [
+    ('positive_high', 'Positive\nHigh', '#CA5A94'),
+    ('negative_low', 'Negative\nLow', '#138866'),
+    ('negative_high', 'Negative\nHigh', '#176C92'),
+    ('positive_low', 'Positive\nLow', '#D59428'),
+]
+# Bump when render_spider_plot changes: every generated plot is then redrawn
+STYLE_VERSION = 1
+MANIFEST_NAME = '.spider_plots.json'
+
+SIZE = 1080
+# Drawn at this multiple of SIZE and downsampled, since ImageDraw does not antialias
+SUPERSAMPLE = 2
+# Radius of the 100 ring and of the 0 ring (the polar hole) as fractions of SIZE
+RADIUS = 0.33
+HOLE = 0.2
+GRID_COLOR = '#d9d9d9'
+LINE_COLOR = '#4d4d4d'
+FILL_COLOR = (77, 77, 77, 100)
+TICK_COLOR = '#666666'
+
+
+def _font(size, bold=False):
+    try:
+        return ImageFont.truetype('DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf', size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def _percent(value):
+    # 50.98 -> "51%", 15.69 -> "15.7%"
+    return f'{value:.1f}'.rstrip('0').rstrip('.') + '%'
+
+
+def render_spider_plot(ratings, total=0):
+    """PNG bytes of the spider plot of ``ratings`` ({rating column: percentage})."""
+    size = SIZE * SUPERSAMPLE
+    image = Image.new('RGB', (size, size), 'white')
+    draw = ImageDraw.Draw(image, 'RGBA')
+    cx, cy = size / 2, size * 0.51
+    outer, inner = RADIUS * size, RADIUS * HOLE * size
+    angles = np.pi / 2 - np.arange(len(AXES)) * 2 * np.pi / len(AXES)
+    directions = np.stack([np.cos(angles), -np.sin(angles)], axis=1)
+
+    def points(radii):
+        return [(cx + r * dx, cy + r * dy) for r, (dx, dy) in zip(radii, directions)]
+
+    def radius(value):
+        return inner + (outer - inner) * min(max(value, 0), 100) / 100
+
+    for value in (0, 25, 50, 75, 100):
+        draw.polygon(points([radius(value)] * len(AXES)), outline=GRID_COLOR, width=SUPERSAMPLE)
+    for dx, dy in directions:
+        draw.line([(cx + inner * dx, cy + inner * dy), (cx + outer * dx, cy + outer * dy)],
+                  fill=GRID_COLOR, width=SUPERSAMPLE)
+
+    tick_font = _font(22 * SUPERSAMPLE)
+    for value in (0, 25, 50, 75, 100):
+        draw.text((cx - 8 * SUPERSAMPLE, cy - radius(value)), str(value), fill=TICK_COLOR, font=tick_font,
+                  anchor='rs')
+
+    shape = points([radius(ratings[column]) for column, _, _ in AXES])
+    draw.polygon(shape, fill=FILL_COLOR)
+    draw.line(shape + shape[:1], fill=LINE_COLOR, width=3 * SUPERSAMPLE, joint='curve')
+    dot = 5 * SUPERSAMPLE
+    for x, y in shape:
+        draw.ellipse([x - dot, y - dot, x + dot, y + dot], fill=LINE_COLOR)
+
+    label_font = _font(30 * SUPERSAMPLE, bold=True)
+    for (column, label, color), (dx, dy) in zip(AXES, directions):
+        r = outer + (0.09 if dy else 0.075) * size
+        draw.multiline_text((cx + r * dx, cy + r * dy), f'{label}\n({_percent(ratings[column])})', fill=color,
+                            font=label_font, anchor='mm', align='center', spacing=8 * SUPERSAMPLE)
+    if total:
+        draw.text((size - 24 * SUPERSAMPLE, size - 24 * SUPERSAMPLE), f'total: {int(total)}', fill=TICK_COLOR,
+                  font=tick_font, anchor='rs')
+
+    buf = io.BytesIO()
+    image.resize((SIZE, SIZE), Image.LANCZOS).save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+
+def plot_key(ratings, total=0):
+    """Changes whenever the plot of these ratings would."""
+    values = ','.join(f'{ratings[c]:.4f}' for c in RATING_COLUMNS)
+    return hashlib.sha1(f'{STYLE_VERSION}:{values}:{int(total)}'.encode('utf-8')).hexdigest()[:16]
+
+
+def write_spider_plot(path, ratings, total=0):
+    """Render to ``path`` atomically, so the app never serves a partial PNG."""
+    write_atomic(path, render_spider_plot(ratings, total))
+    return path
+
+
+def _render_job(job):
+    path, ratings, total = job
+    return write_spider_plot(path, ratings, total)
+
+
+def read_manifest(image_dir):
+    try:
+        with open(os.path.join(image_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def rated_rows(df):
+    """Rows of ``df`` with all four ratings."""
+    return df[df[RATING_COLUMNS].notna().all(axis=1)]
+
+
+def build(dataset, workers, force=False):
+    df = pd.read_csv(dataset.csv_path)
+    os.makedirs(dataset.image_dir, exist_ok=True)
+    old_manifest = read_manifest(dataset.image_dir)
+    rated = rated_rows(df)
+
+    manifest, jobs = {}, []
+    for row in rated.itertuples(index=False):
+        name = row.file.replace('.wav', '.png')
+        ratings = {c: getattr(row, c) for c in RATING_COLUMNS}
+        key = plot_key(ratings, row.total)
+        path = os.path.join(dataset.image_dir, name)
+        manifest[name] = key
+        exists = os.path.exists(path)
+        if exists and not force and old_manifest.get(name, key) == key:
+            if name not in old_manifest:
+                # An original plot: keep it and leave it unkeyed
+                del manifest[name]
+            continue
+        jobs.append((path, ratings, row.total))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        done = list(executor.map(_render_job, jobs, chunksize=8))
+    with open(os.path.join(dataset.image_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    print(f'{len(done)} spider plots drawn, {len(rated) - len(done)} up to date, '
+          f'{len(df) - len(rated)} rows without ratings skipped')
+
+    has_image = df['file'].map(lambda f: os.path.exists(os.path.join(dataset.image_dir, f.replace('.wav', '.png'))))
+    changed = int((has_image != df['has_image']).sum())
+    if changed:
+        df['has_image'] = has_image
+        write_csv(df, dataset.csv_path, dataset.columns_dir)
+        print(f'Updated has_image of {changed} rows in {dataset.csv_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Draw the spider plots of every rated call')
+    parser.add_argument('--dataset', help='registered dataset id (default: the default dataset)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='redraw every plot, including the original ones')
+    args = parser.parse_args()
+
+    registry = DatasetRegistry.from_manifest()
+    dataset = registry.describe(args.dataset or registry.default)
+    if not dataset.image_dir:
+        parser.error(f'dataset {dataset.id!r} has no image_dir')
+    build(dataset, args.workers, args.force)
+
+
+if __name__ == '__main__':
+    main()
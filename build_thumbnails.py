@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Resized WebP variants of the spider plots for the /images route.
+
+    python build_thumbnails.py [--widths 240 480 960] [--quality 80] [--workers 4]
+
+Writes spider_plots_thumbs/<stem>-<width>.<hash>.webp and a manifest.json
+mapping each PNG stem to its variants. File names carry a content hash so
+they can be cached forever. Only PNGs whose content changed since the last
+run are re-encoded.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from atomic import write_atomic
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(BASE_DIR, 'spider_plots')
+IMAGE_THUMBS_DIR = os.path.join(BASE_DIR, 'spider_plots_thumbs')
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_WIDTHS = [240, 480, 960]
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_manifest(thumbs_dir=IMAGE_THUMBS_DIR):
+    try:
+        with open(os.path.join(thumbs_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def encode_variants(src, out_dir, widths, quality):
+    """Write the WebP variants of ``src`` and return {width: file name}."""
+    stem = os.path.splitext(os.path.basename(src))[0]
+    variants = {}
+    with Image.open(src) as im:
+        im.load()
+        for width in widths:
+            # Never upscale; the largest variant is capped at the source width
+            width = min(width, im.width)
+            if str(width) in variants:
+                continue
+            height = round(im.height * width / im.width)
+            buf = io.BytesIO()
+            im.resize((width, height), Image.LANCZOS).save(buf, 'WEBP', quality=quality)
+            data = buf.getvalue()
+            name = f'{stem}-{width}.{_sha1(data)[:10]}.webp'
+            with open(os.path.join(out_dir, name), 'wb') as f:
+                f.write(data)
+            variants[str(width)] = name
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build WebP variants of the spider plots')
+    parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS)
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--src', default=IMAGE_DIR)
+    parser.add_argument('--out', default=IMAGE_THUMBS_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    old_manifest = read_manifest(args.out)
+    settings = {'widths': sorted(args.widths), 'quality': args.quality}
+
+    manifest, jobs = {}, {}
+    for name in sorted(os.listdir(args.src)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != '.png':
+            continue
+        src = os.path.join(args.src, name)
+        with open(src, 'rb') as f:
+            source_hash = _sha1(f.read())
+        entry = old_manifest.get(stem)
+        if (entry and entry['source'] == source_hash and entry.get('settings') == settings
+                and all(os.path.exists(os.path.join(args.out, v)) for v in entry['variants'].values())):
+            manifest[stem] = entry
+        else:
+            manifest[stem] = {'source': source_hash, 'settings': settings, 'variants': {}}
+            jobs[stem] = src
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {stem: pool.submit(encode_variants, src, args.out, settings['widths'], args.quality)
+                   for stem, src in jobs.items()}
+        for stem, future in futures.items():
+            manifest[stem]['variants'] = future.result()
+
+    # Drop variants no longer referenced (changed or deleted sources)
+    referenced = {v for entry in manifest.values() for v in entry['variants'].values()}
+    for name in os.listdir(args.out):
+        if name.endswith('.webp') and name not in referenced:
+            os.remove(os.path.join(args.out, name))
+
+    write_atomic(os.path.join(args.out, MANIFEST_NAME), json.dumps(manifest, indent=1, sort_keys=True))
+
+    print(f"Encoded {len(jobs)} of {len(manifest)} spider plot(s) into {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Typed columnar copy of data_precomputed.csv.
+
+``python dataset.py build`` converts the CSV into one ``.npy`` file per
+column plus a ``manifest.json``. String columns are stored as
+dictionary-encoded integer codes. ``load_columns`` memory-maps only the
+requested columns and falls back to the CSV when the artifact is missing
+or was built from a different version of the CSV; ``iter_rows`` reads a
+subset of rows with every column, a chunk at a time.
+"""
+
+import argparse
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from atomic import write_atomic
+from figure_cache import file_fingerprint
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, 'data_precomputed.csv')
+COLUMNS_DIR = os.path.join(BASE_DIR, 'data_columns')
+MANIFEST_NAME = 'manifest.json'
+
+
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def build_columns(csv_path=CSV_PATH, out_dir=COLUMNS_DIR):
+    """Write one ``.npy`` per column of ``csv_path`` and the manifest describing them."""
+    df = pd.read_csv(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    columns = {}
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        file_name = f'{i:03d}.npy'
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+            columns[name] = {'kind': 'numeric', 'file': file_name, 'dtype': str(values.dtype)}
+        else:
+            codes, categories = pd.factorize(series)
+            values = codes.astype(_code_dtype(len(categories)))
+            columns[name] = {'kind': 'category', 'file': file_name, 'dtype': str(values.dtype),
+                             'categories': [str(c) for c in categories]}
+        # Running workers keep the old file memory-mapped: swap in a new inode
+        # rather than truncating the one they map
+        buffer = io.BytesIO()
+        np.save(buffer, values, allow_pickle=False)
+        write_atomic(os.path.join(out_dir, file_name), buffer.getbuffer())
+
+    manifest = {
+        'source': os.path.basename(csv_path),
+        'source_fingerprint': file_fingerprint(csv_path),
+        'rows': len(df),
+        'columns': columns,
+    }
+    # Manifest last: a half-written artifact has no manifest and is ignored
+    write_atomic(os.path.join(out_dir, MANIFEST_NAME), json.dumps(manifest, indent=1))
+    return manifest
+
+
+def write_csv(df, csv_path=CSV_PATH, columns_dir=COLUMNS_DIR):
+    """Replace ``csv_path`` with ``df`` and rebuild its artifact (skipped if ``columns_dir`` is None)."""
+    # The app may be reading the CSV and mapping the artifact
+    write_atomic(csv_path, df.to_csv(index=False))
+    if columns_dir:
+        build_columns(csv_path, columns_dir)
+
+
+def read_manifest(columns_dir=COLUMNS_DIR, csv_path=CSV_PATH):
+    """Manifest of the artifact, or None if it is missing or stale."""
+    try:
+        with open(os.path.join(columns_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if os.path.exists(csv_path) and manifest.get('source_fingerprint') != file_fingerprint(csv_path):
+        return None
+    return manifest
+
+
+def load_columns(columns, columns_dir=COLUMNS_DIR, csv_path=CSV_PATH):
+    """DataFrame with only ``columns``, memory-mapped from the artifact when available.
+
+    ``columns_dir`` None reads the CSV directly.
+    """
+    manifest = read_manifest(columns_dir, csv_path) if columns_dir else None
+    if manifest is None:
+        return pd.read_csv(csv_path, usecols=lambda c: c in set(columns))[list(columns)]
+
+    data = {}
+    for name in columns:
+        meta = manifest['columns'][name]
+        values = np.load(os.path.join(columns_dir, meta['file']), mmap_mode='r', allow_pickle=False)
+        if meta['kind'] == 'category':
+            data[name] = pd.Categorical.from_codes(values, categories=meta['categories'])
+        else:
+            data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def iter_rows(rows, chunk_rows=10000, columns_dir=COLUMNS_DIR, csv_path=CSV_PATH):
+    """DataFrames of the sorted row numbers ``rows`` with all the CSV's columns, ``chunk_rows`` at a time.
+
+    Only one chunk is in memory: artifact columns are indexed through
+    their memory maps, and without an artifact the CSV is read in chunks.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    manifest = read_manifest(columns_dir, csv_path) if columns_dir else None
+    if manifest is None:
+        offset = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            picked = rows[(rows >= offset) & (rows < offset + len(chunk))] - offset
+            offset += len(chunk)
+            yield chunk.iloc[picked]
+        return
+
+    arrays = {name: np.load(os.path.join(columns_dir, meta['file']), mmap_mode='r', allow_pickle=False)
+              for name, meta in manifest['columns'].items()}
+    for start in range(0, max(len(rows), 1), chunk_rows):
+        picked = rows[start:start + chunk_rows]
+        data = {}
+        for name, meta in manifest['columns'].items():
+            values = arrays[name][picked]
+            if meta['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, categories=meta['categories'])
+            data[name] = values
+        yield pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the columnar copy of data_precomputed.csv')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--out', default=COLUMNS_DIR)
+    args = parser.parse_args()
+
+    manifest = build_columns(args.csv, args.out)
+    print(f"Wrote {len(manifest['columns'])} columns x {manifest['rows']} rows to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+File-backed cache of serialized base figures, keyed by color dimension.
+
+Entries are written to disk so every gunicorn worker (and every restart)
+reuses figures built once, and are keyed by a fingerprint of the source
+data so they invalidate when data_precomputed.csv changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import plotly
+import plotly.io as pio
+
+from atomic import write_atomic
+from memory import sizeof
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Content hash of ``path``, used to invalidate entries built from older data."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class FigureCache:
+    """Two-level cache: a bounded in-process LRU in front of a shared directory."""
+
+    def __init__(self, build, data_path, cache_dir, version='1', maxsize=16):
+        self.build = build
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self.fingerprint = file_fingerprint(data_path)
+        self.version = f'{version}-{plotly.__version__}'
+        self.entry_dir = os.path.join(cache_dir, f'{self.fingerprint}-{self.version}')
+        self._memory = OrderedDict()
+
+    def _path(self, key):
+        name = '_'.join(str(part) for part in (key if isinstance(key, tuple) else (key,)))
+        return os.path.join(self.entry_dir, f'{name}.json')
+
+    def _read(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, path, figure_json):
+        try:
+            write_atomic(path, figure_json)
+        except OSError:
+            # Only a cache: the figure is still served, and rebuilt on the next miss
+            pass
+
+    def get(self, key):
+        """Return the base figure for ``key`` as a plain dict. Callers must not mutate it."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key][0]
+
+        path = self._path(key)
+        figure_json = self._read(path)
+        try:
+            figure = json.loads(figure_json) if figure_json is not None else None
+        except ValueError:
+            figure = None
+        if figure is None:
+            figure_json = pio.to_json(self.build(*(key if isinstance(key, tuple) else (key,))), validate=False)
+            self._write(path, figure_json)
+            figure = json.loads(figure_json)
+
+        # The parsed dict holds ~4x its JSON length, so it is measured once here
+        self._memory[key] = (figure, sizeof(figure))
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+        return figure
+
+    @property
+    def nbytes(self):
+        """Approximate bytes of the figures held in memory."""
+        return sum(size for _, size in list(self._memory.values()))
+
+    def warm(self, keys):
+        """Load or build every key, e.g. at worker startup, and drop stale entries."""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name != os.path.basename(self.entry_dir):
+                    shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        for key in keys:
+            self.get(key)
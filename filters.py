@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Metadata filters backed by one precomputed boolean mask per column value.
+
+A filter state is ``{column: [values]}``: a call matches when, for every
+column, its value is one of the listed ones. With the masks built once
+per dataset, applying a filter is a few ``|`` and ``&`` over boolean
+arrays, whatever the number of columns combined, instead of string
+comparisons over the data.
+
+The state lives in the page URL as a query string (``?subject=Zamba&
+subject=Habari&Playback=No``), normalized so one filter has one URL.
+"""
+
+from urllib.parse import parse_qs, urlencode
+
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    """Boolean masks of ``data`` for every value of each of ``columns``.
+
+    Values are compared as strings, so booleans are 'True'/'False' as they
+    appear in a URL.
+    """
+
+    def __init__(self, data, columns):
+        self.columns = list(columns)
+        self.n_rows = len(data)
+        self.masks = {}
+        for column in self.columns:
+            codes, values = pd.factorize(data[column].astype(str), sort=True)
+            self.masks[column] = {value: codes == i for i, value in enumerate(values)}
+
+    def values(self, column):
+        """``(value, count)`` for every value of ``column``, in sorted order."""
+        return [(value, int(mask.sum())) for value, mask in self.masks[column].items()]
+
+    def normalize(self, filters):
+        """``filters`` restricted to known columns and values, each list sorted, empty ones dropped."""
+        normalized = {}
+        for column in self.columns:
+            values = sorted({str(v) for v in filters.get(column) or ()} & self.masks[column].keys())
+            if values:
+                normalized[column] = values
+        return normalized
+
+    def mask(self, filters):
+        """Rows matching every column of ``filters`` (any of its values); None when nothing is filtered.
+
+        An unknown value matches no row, so a stale or mistyped URL never widens the filter.
+        """
+        result = None
+        for column, values in filters.items():
+            if not values or column not in self.masks:
+                continue
+            masks = self.masks[column]
+            empty = np.zeros(self.n_rows, dtype=bool)
+            matches = np.logical_or.reduce([masks.get(str(v), empty) for v in values])
+            result = matches if result is None else result & matches
+        return result
+
+
+def parse_query(search):
+    """Filter state from a URL query string such as ``?subject=Zamba&Playback=No``."""
+    return parse_qs((search or '').lstrip('?'))
+
+
+def to_query(filters):
+    """URL query string of a (normalized) filter state, '' when nothing is filtered."""
+    query = urlencode([(column, value) for column, values in filters.items() for value in values])
+    return f'?{query}' if query else ''
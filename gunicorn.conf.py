@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn settings for ``gunicorn app:server -c gunicorn.conf.py``.
+
+Media downloads must not hold the workers the Dash callbacks need. With
+the default sync worker one slow client on /segments occupies a whole
+process for the length of the transfer. With gthread it occupies one
+thread, while send_file streams the file through ``wsgi.file_wrapper``
+(sendfile, or fixed-size chunks) so memory stays bounded per download.
+
+    WEB_CONCURRENCY        worker processes (default 1)
+    GUNICORN_THREADS       threads per gthread worker (default 8)
+    GUNICORN_WORKER_CLASS  gthread (default), gevent (needs ``pip install gevent``) or sync
+    GUNICORN_TIMEOUT       seconds before a silent worker is restarted (default 60)
+
+Sizing: callbacks are CPU bound (a few ms each, see benchmarks/load.py),
+so processes beyond the core count only add memory, one copy of the
+dataset and figure cache each. Threads are what absorb slow downloads.
+The default is gunicorn's single worker: inside a container the CPU count
+is the host's, not the instance's quota, and each worker holds its own
+dataset, figures and derived state. Set WEB_CONCURRENCY to the cores the
+instance actually has (render.yaml does, for its plan) if its memory
+allows, and raise GUNICORN_THREADS with the number of concurrent
+listeners you expect. Measure with
+``python benchmarks/load.py --scenarios mixed`` when changing either.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# gunicorn turns sync workers into gthread ones whenever threads > 1
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+# Greenlets per gevent worker; downloads are mostly waiting on the socket
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
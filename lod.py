@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Level-of-detail sampling of the embedding for large datasets.
+
+A uniform voxel grid over the 2D/3D coordinates stratifies a random
+sample: every voxel keeps a share of the budget proportional to its
+point count, and at least one point, so dense clusters keep their
+relative density and sparse outliers do not vanish from the overview.
+"""
+
+import numpy as np
+
+
+class VoxelGrid:
+    """Voxel index over ``coords`` (n points x 2 or 3 dims) for bounded-size sampling."""
+
+    def __init__(self, coords, cells_per_axis=None, seed=0):
+        coords = np.asarray(coords, dtype=np.float64)
+        n, dims = coords.shape
+        if cells_per_axis is None:
+            # ~8 points per voxel on average, capped to keep the voxel count manageable
+            cells_per_axis = int(np.clip(round((n / 8) ** (1 / dims)), 1, 256 if dims == 2 else 64))
+        self.coords = coords
+        self.cells_per_axis = cells_per_axis
+        self.lo = coords.min(axis=0)
+        self.hi = coords.max(axis=0)
+
+        span = np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+        cell = np.minimum(((coords - self.lo) / span * cells_per_axis).astype(np.int64), cells_per_axis - 1)
+        self.voxel = np.ravel_multi_index(cell.T, (cells_per_axis,) * dims)
+
+        # Points ordered by voxel, in random order within each voxel. Taking the
+        # first q points of a voxel from this order is a uniform sample of it.
+        priority = np.random.default_rng(seed).permutation(n)
+        self.order = np.lexsort((priority, self.voxel))
+
+    def __len__(self):
+        return len(self.coords)
+
+    def mask_in_bounds(self, bounds):
+        """Boolean mask of points inside ``bounds``: one ``(low, high)`` or None per axis."""
+        mask = np.ones(len(self), dtype=bool)
+        for axis, limits in enumerate(bounds):
+            if limits is None:
+                continue
+            low, high = limits
+            mask &= (self.coords[:, axis] >= low) & (self.coords[:, axis] <= high)
+        return mask
+
+    def sample(self, budget, mask=None):
+        """Row indices (sorted) of a density-preserving sample of at most ``budget`` points.
+
+        Only points where ``mask`` is True are candidates. Returns every
+        candidate when they already fit in the budget.
+        """
+        ordered = self.order if mask is None else self.order[mask[self.order]]
+        if len(ordered) <= budget:
+            return np.sort(ordered)
+
+        # ``ordered`` is grouped by voxel, so runs start wherever the voxel id changes
+        starts = np.flatnonzero(np.diff(self.voxel[ordered], prepend=-1))
+        counts = np.diff(starts, append=len(ordered))
+        quota = self._quota(counts, budget)
+        # Position of each candidate within its voxel's run in ``ordered``
+        rank = np.arange(len(ordered)) - np.repeat(starts, counts)
+        keep = rank < np.repeat(quota, counts)
+        return np.sort(ordered[keep])
+
+    @staticmethod
+    def _quota(counts, budget):
+        """Per-voxel sample sizes: proportional to ``counts``, at least 1, summing to <= budget."""
+        if len(counts) >= budget:
+            # More occupied voxels than budget: one point from the most populated ones
+            quota = np.zeros_like(counts)
+            quota[np.argsort(counts)[::-1][:budget]] = 1
+            return quota
+        # Largest sampling fraction whose quotas still fit the budget
+        low, high = 0.0, budget / counts.sum()
+        for _ in range(30):
+            mid = (low + high) / 2
+            if np.maximum(1, np.floor(counts * mid)).sum() <= budget:
+                low = mid
+            else:
+                high = mid
+        return np.maximum(1, np.floor(counts * low)).astype(np.int64)
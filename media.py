@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Static media responses for the /segments and /images routes.
+
+Files are served through Flask's conditional ``send_file``, which answers
+``Range`` requests with ``206 Partial Content`` and ``If-None-Match`` with
+``304``. ETags are strong content hashes so they stay valid across
+deploys and workers. The body is streamed through ``wsgi.file_wrapper``
+(sendfile under gunicorn) rather than read into memory, so a slow client
+costs a worker thread, not the file size; see gunicorn.conf.py.
+"""
+
+import hashlib
+import os
+
+from flask import abort, send_file
+from werkzeug.security import safe_join
+
+# One week for URLs that may change content, one year for content-hashed URLs
+DEFAULT_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 7 * 24 * 3600))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_etags = {}
+
+
+def content_etag(path, chunk_size=1 << 20):
+    """Strong ETag for ``path``, recomputed only when its mtime or size changes."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    etag = _etags.get(key)
+    if etag is None:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        etag = _etags[key] = digest.hexdigest()
+    return etag
+
+
+def find_media(filename, *directories):
+    """Path of ``filename`` in the first directory that has it, or None."""
+    for directory in directories:
+        path = safe_join(directory, filename)
+        if path is not None and os.path.isfile(path):
+            return path
+    return None
+
+
+def send_media(filename, *directories, immutable=False):
+    """Send ``filename`` from the first directory that has it, with range and cache support."""
+    path = find_media(filename, *directories)
+    if path is None:
+        abort(404)
+
+    response = send_file(path, conditional=True, etag=content_etag(path),
+                         max_age=IMMUTABLE_MAX_AGE if immutable else DEFAULT_MAX_AGE)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
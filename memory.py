@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Approximate memory footprint of in-process state, for the dataset LRU budget.
+"""
+
+import sys
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def sizeof(value, _seen=None):
+    """Approximate bytes held by ``value``.
+
+    Anything with an integer ``nbytes`` (arrays, FigureCache) reports its
+    own size; containers and plain objects are walked recursively.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    if isinstance(value, cKDTree):
+        return value.data.nbytes + value.indices.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, seen) + sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v, seen) for v in value)
+    if hasattr(value, '__dict__') and not callable(value):
+        return sys.getsizeof(value) + sizeof(vars(value), seen)
+    return sys.getsizeof(value)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation: latency and payload histograms, a Prometheus
+``/metrics`` endpoint and per-request profiling.
+
+    APP_METRICS=1        time handlers, count response bytes, serve /metrics
+    APP_PROFILE=1        profile requests sent with ?profile=1 or an X-Profile header
+    APP_PROFILE=all      profile every request
+    APP_PROFILE_DIR=...  where profiles are written (default .cache/profiles)
+
+With both off, ``timed`` returns the handler unchanged and no request
+hooks are installed. Metrics are kept per process: with several gunicorn
+workers each scrape reports the worker that answered it.
+"""
+
+import cProfile
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+METRICS_ENABLED = os.environ.get('APP_METRICS', '0') == '1'
+PROFILE_MODE = os.environ.get('APP_PROFILE', '0')
+PROFILE_DIR = os.environ.get('APP_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             '.cache', 'profiles'))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label set."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = ','.join(f'{k}="{v}"' for k, v in key)
+                sep = ',' if labels else ''
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+handler_duration = Histogram('app_handler_duration_seconds',
+                             'Time spent in Dash callbacks and Flask routes.', LATENCY_BUCKETS)
+response_bytes = Histogram('app_response_bytes',
+                           'Size of responses sent by Dash callbacks and Flask routes.', BYTES_BUCKETS)
+startup_seconds = {}
+
+
+@contextmanager
+def startup_phase(name):
+    """Record how long an import-time phase (data loading, cache warming...) took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_seconds[name] = time.perf_counter() - start
+
+
+def timed(name, kind='callback'):
+    """Decorator recording the latency of a Dash callback or Flask route as ``name``."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Picked up by the after_request hook to attribute the response size
+            g.metrics_handler = (kind, name)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                handler_duration.observe(time.perf_counter() - start, kind=kind, name=name)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    lines = handler_duration.render() + response_bytes.render()
+    lines += ['# HELP app_startup_seconds Duration of import-time startup phases.',
+              '# TYPE app_startup_seconds gauge']
+    lines += [f'app_startup_seconds{{phase="{phase}"}} {seconds}' for phase, seconds in startup_seconds.items()]
+    return '\n'.join(lines) + '\n'
+
+
+def _should_profile():
+    if PROFILE_MODE == 'all':
+        return True
+    return PROFILE_MODE == '1' and (request.args.get('profile') == '1' or 'X-Profile' in request.headers)
+
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+
+def _dump_profile(profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+                                     f"{re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'}")
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+    else:
+        profiler.stop()
+        with open(stem + '.html', 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+
+
+def init_app(server):
+    """Install the request hooks and the /metrics route, if enabled."""
+    if METRICS_ENABLED:
+        @server.after_request
+        def count_response_bytes(response):
+            handler = g.pop('metrics_handler', None)
+            if handler is not None and response.content_length is not None:
+                response_bytes.observe(response.content_length, kind=handler[0], name=handler[1])
+            return response
+
+        @server.route('/metrics')
+        def metrics():
+            return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    if PROFILE_MODE in ('1', 'all'):
+        @server.before_request
+        def start_profile():
+            if _should_profile():
+                g.profiler = _start_profiler()
+
+        @server.after_request
+        def stop_profile(response):
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                _dump_profile(profiler)
+            return response
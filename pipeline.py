@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Ingest pipeline: place newly recorded calls in the existing acoustic space.
+
+    python pipeline.py bootstrap [--dataset ID] [--workers 4]
+    python pipeline.py ingest    [--dataset ID] [--metadata new_calls.csv] [--workers 4]
+    python pipeline.py refit     [--dataset ID] [--workers 4]
+
+``ingest`` picks up the WAVs in the dataset's audio directory that have no
+row yet, extracts their features in parallel, projects them with the saved
+models (UMAP ``transform``, never a refit) and appends them to the CSV with
+``has_audio``/``has_image`` set, then rebuilds the columnar artifact. Only
+the new calls are processed, so a batch takes seconds.
+
+``bootstrap`` saves the models ``ingest`` needs without touching the
+CSV: it fits them like ``refit``, then anchors each UMAP model's
+``embedding_`` to the stored coordinates, so ``transform`` places new calls
+in the published map. Run it once per dataset, and again after a
+FEATURE_VERSION change.
+
+``refit`` is the explicit full recomputation. It refits the feature
+projection on every call with audio and both UMAP models on PC1..PC20 of
+every row, initialized at the current coordinates to limit drift, and
+rewrites the UMAP columns to the models' embedding: the map moves, which
+is why it is never part of ``ingest``.
+
+The features behind the stored PC1..PC20 are not part of this repository,
+so new calls are placed with a projection (standardize, PCA, ridge) from
+this module's spectral features onto PC1..PC20, calibrated on the calls
+with audio. ``refit`` reports its cross-validated R^2.
+
+Models live in models/<dataset id>/ (PIPELINE_MODELS_DIR). Needs requirements-pipeline.txt.
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset import write_csv
+from figure_cache import file_fingerprint
+from registry import DatasetRegistry
+from spectrogram import SpectrogramParams, read_wav, stft_db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.environ.get('PIPELINE_MODELS_DIR', os.path.join(BASE_DIR, 'models'))
+# Bump when extract_features changes: saved models then require a refit
+FEATURE_VERSION = 1
+N_MELS = 40
+UMAP_3D = ['UMAP_1', 'UMAP_2', 'UMAP_3']
+UMAP_2D = ['UMAP_2D_1', 'UMAP_2D_2']
+# Subject name in file names such as S1_Call1822_Daniela.wav or Call1008_Yahimba_10.wav
+SUBJECT_PATTERN = re.compile(r'Call\d+_([A-Za-z]+)')
+
+
+@functools.lru_cache(maxsize=None)
+def mel_filterbank(sample_rate, n_fft, n_mels=N_MELS, fmin=50.0):
+    """Triangular mel filters, ``(n_mels, n_fft // 2 + 1)``."""
+    def to_mel(f):
+        return 2595 * np.log10(1 + f / 700)
+
+    edges = 700 * (10 ** (np.linspace(to_mel(fmin), to_mel(sample_rate / 2), n_mels + 2) / 2595) - 1)
+    freqs = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    low, center, high = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    return np.maximum(0, np.minimum((freqs - low) / (center - low), (high - freqs) / (high - center)))
+
+
+def extract_features(path):
+    """Fixed-length acoustic descriptor of a WAV: log-mel band statistics and spectral shape."""
+    samples, rate = read_wav(path)
+    params = SpectrogramParams()
+    db, freqs = stft_db(samples, rate, params)
+    power = 10 ** (db / 10)
+    log_mel = np.log(mel_filterbank(rate, params.n_fft) @ power + 1e-10)
+
+    total = power.sum(axis=0) + 1e-12
+    centroid = (freqs[:, None] * power).sum(axis=0) / total
+    bandwidth = np.sqrt(((freqs[:, None] - centroid) ** 2 * power).sum(axis=0) / total)
+    flatness = np.exp(np.log(power + 1e-12).mean(axis=0)) / (power.mean(axis=0) + 1e-12)
+    rms = np.sqrt(np.mean(samples ** 2))
+    return np.concatenate([
+        log_mel.mean(axis=1), log_mel.std(axis=1),
+        [centroid.mean(), centroid.std(), bandwidth.mean(), bandwidth.std(), flatness.mean(),
+         len(samples) / rate, np.log(rms + 1e-9)],
+    ])
+
+
+def extract_all(paths, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.stack(list(executor.map(extract_features, paths, chunksize=8)))
+
+
+def _models_dir(dataset):
+    return os.path.join(MODELS_DIR, dataset.id)
+
+
+def _source_columns(dataset, columns):
+    return [dataset.column_map.get(c, c) for c in columns]
+
+
+def fit_models(dataset, data, workers, keep_coordinates, n_neighbors=15, min_dist=0.1, seed=0):
+    """Fit and save the feature projection and both UMAP models of ``data``; returns the projection's R^2.
+
+    With ``keep_coordinates`` the UMAP models are anchored to the stored
+    coordinates, otherwise the UMAP columns of ``data`` are set to their
+    new embedding.
+    """
+    import joblib
+    from sklearn.decomposition import PCA
+    from sklearn.linear_model import Ridge
+    from sklearn.metrics import make_scorer, r2_score
+    from sklearn.model_selection import cross_val_score
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from umap import UMAP
+
+    pcs = data[dataset.features].to_numpy(dtype=np.float64)
+    audio = data['has_audio'].astype(bool).to_numpy() & data['file'].map(
+        lambda name: os.path.isfile(os.path.join(dataset.audio_dir, name))).to_numpy()
+    paths = [os.path.join(dataset.audio_dir, name) for name in data.loc[audio, 'file']]
+    print(f'Extracting features of {len(paths)} calls with audio')
+    features = extract_all(paths, workers)
+
+    projection = make_pipeline(StandardScaler(), PCA(n_components=0.99, random_state=seed), Ridge(alpha=10.0))
+    # Weighted by PC variance: PC1 matters more to the placement than PC20
+    scoring = make_scorer(r2_score, multioutput='variance_weighted')
+    r2 = cross_val_score(projection, features, pcs[audio], cv=5, scoring=scoring)
+    projection.fit(features, pcs[audio])
+    print(f'Feature projection onto {len(dataset.features)} PCs: cross-validated R^2 {r2.mean():.2f}')
+
+    models_dir = _models_dir(dataset)
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump(projection, os.path.join(models_dir, 'projection.joblib'))
+    for name, columns in (('umap_3d', UMAP_3D), ('umap_2d', UMAP_2D)):
+        source = _source_columns(dataset, columns)
+        stored = data[source].to_numpy(dtype=np.float64)
+        print(f'Fitting {name} on {len(pcs)} rows')
+        model = UMAP(n_components=len(columns), n_neighbors=n_neighbors, min_dist=min_dist, init=stored,
+                     random_state=seed)
+        embedding = model.fit_transform(pcs)
+        if keep_coordinates:
+            # transform() places new points against embedding_, so they land in the published map.
+            # Its numba kernels expect the float32, C-contiguous layout of UMAP's own embedding
+            model.embedding_ = np.ascontiguousarray(stored, dtype=np.float32)
+        else:
+            data[source] = embedding
+        joblib.dump(model, os.path.join(models_dir, f'{name}.joblib'))
+    return float(r2.mean())
+
+
+def bootstrap(dataset, workers):
+    data = pd.read_csv(dataset.csv_path)
+    r2 = fit_models(dataset, data, workers, keep_coordinates=True)
+    _write_meta(dataset, {'feature_version': FEATURE_VERSION, 'projection_r2': round(r2, 4)})
+    print(f'Saved models in {_models_dir(dataset)}; {dataset.csv_path} is unchanged')
+
+
+def refit(dataset, workers):
+    data = pd.read_csv(dataset.csv_path)
+    r2 = fit_models(dataset, data, workers, keep_coordinates=False)
+    write_csv(data, dataset.csv_path, dataset.columns_dir)
+    _write_meta(dataset, {'feature_version': FEATURE_VERSION, 'projection_r2': round(r2, 4)})
+    print(f'Rewrote the UMAP columns of {dataset.csv_path}; models in {_models_dir(dataset)}')
+
+
+def _write_meta(dataset, meta):
+    meta = dict(meta, source_fingerprint=file_fingerprint(dataset.csv_path))
+    with open(os.path.join(_models_dir(dataset), 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+
+
+def _read_meta(dataset):
+    try:
+        with open(os.path.join(_models_dir(dataset), 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise SystemExit(f'No models for dataset {dataset.id!r}: run `python pipeline.py bootstrap` first')
+
+
+def new_rows(data, files, metadata, dataset):
+    """Rows for ``files``: ``metadata`` where given, the subject parsed from the name, else blanks."""
+    rows = pd.DataFrame({'file': files})
+    if metadata is not None:
+        rows = rows.merge(metadata, on='file', how='left')
+    if 'subject' in data.columns:
+        parsed = rows['file'].str.extract(SUBJECT_PATTERN, expand=False)
+        rows['subject'] = rows['subject'].fillna(parsed) if 'subject' in rows else parsed
+    if 'Unnamed: 0' in data.columns:
+        rows['Unnamed: 0'] = np.arange(len(rows)) + int(data['Unnamed: 0'].max()) + 1
+
+    for column in data.columns:
+        if column not in rows:
+            if pd.api.types.is_bool_dtype(data[column]):
+                rows[column] = False
+            elif pd.api.types.is_integer_dtype(data[column]):
+                rows[column] = 0
+            elif pd.api.types.is_numeric_dtype(data[column]):
+                rows[column] = np.nan
+            else:
+                rows[column] = 'unknown'
+        elif not pd.api.types.is_numeric_dtype(data[column]):
+            rows[column] = rows[column].fillna('unknown')
+    rows['has_audio'] = True
+    if dataset.image_dir:
+        rows['has_image'] = [os.path.isfile(os.path.join(dataset.image_dir, name.replace('.wav', '.png')))
+                             for name in rows['file']]
+    return rows[list(data.columns)]
+
+
+def ingest(dataset, workers, metadata_path=None):
+    import joblib
+
+    meta = _read_meta(dataset)
+    if meta['feature_version'] != FEATURE_VERSION:
+        raise SystemExit('The saved models predate the current features: run `python pipeline.py bootstrap`')
+    if meta['source_fingerprint'] != file_fingerprint(dataset.csv_path):
+        print('Warning: the CSV changed since the models were saved (refit or edited by hand)')
+
+    data = pd.read_csv(dataset.csv_path)
+    known = set(data['file'])
+    files = sorted(name for name in os.listdir(dataset.audio_dir)
+                   if name.lower().endswith('.wav') and name not in known)
+    if not files:
+        print('No new calls')
+        return
+
+    features = extract_all([os.path.join(dataset.audio_dir, name) for name in files], workers)
+    models_dir = _models_dir(dataset)
+    pcs = joblib.load(os.path.join(models_dir, 'projection.joblib')).predict(features)
+
+    metadata = pd.read_csv(metadata_path) if metadata_path else None
+    rows = new_rows(data, files, metadata, dataset)
+    rows[dataset.features] = pcs
+    for name, columns in (('umap_3d', UMAP_3D), ('umap_2d', UMAP_2D)):
+        model = joblib.load(os.path.join(models_dir, f'{name}.joblib'))
+        rows[_source_columns(dataset, columns)] = model.transform(pcs)
+
+    write_csv(pd.concat([data, rows], ignore_index=True), dataset.csv_path, dataset.columns_dir)
+    _write_meta(dataset, meta)
+    print(f'Appended {len(rows)} call(s) to {dataset.csv_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add new calls to a dataset, or refit its projection')
+    parser.add_argument('command', choices=['bootstrap', 'ingest', 'refit'])
+    parser.add_argument('--dataset', help='registered dataset id (default: the default dataset)')
+    parser.add_argument('--metadata', help='CSV with a file column and any dataset columns for the new calls')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    registry = DatasetRegistry.from_manifest()
+    dataset = registry.describe(args.dataset or registry.default)
+    if args.command == 'bootstrap':
+        bootstrap(dataset, args.workers)
+    elif args.command == 'refit':
+        refit(dataset, args.workers)
+    else:
+        ingest(dataset, args.workers, args.metadata)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the datasets one deployment can serve.
+
+``datasets.json`` (or the file named by DATASETS_MANIFEST) lists every
+dataset with its source CSV, columnar artifact and media roots:
+
+    {
+      "default": "bonobos",
+      "datasets": [
+        {"id": "bonobos", "label": "Bonobo calls",
+         "csv": "data_precomputed.csv", "columns_dir": "data_columns",
+         "audio_dir": "audio", "audio_compressed_dir": "audio_compressed",
+         "image_dir": "spider_plots", "image_thumbs_dir": "spider_plots_thumbs",
+         "columns": {"UMAP_1": "UMAP_seed7_1"}, "features": ["PC1", "PC2"]}
+      ]
+    }
+
+Paths are relative to the manifest. ``columns`` maps the column names the
+app expects to the dataset's own names, so another UMAP seed can live in
+extra columns of the same CSV. ``features`` are the columns of the
+similarity search (PC1..PC20 by default).
+
+Datasets are loaded on first use and kept in an LRU bounded by
+DATASET_CACHE_MB. Everything derived from a dataset (indexes, figure
+caches) is stored on it with ``derived`` so eviction frees it too, and
+counts towards that budget.
+
+    python registry.py build    # columnar artifact of every dataset
+"""
+
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from dataset import build_columns, load_columns
+from memory import sizeof
+from similarity import PC_COLUMNS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.environ.get('DATASETS_MANIFEST', os.path.join(BASE_DIR, 'datasets.json'))
+DEFAULT_CACHE_BYTES = int(os.environ.get('DATASET_CACHE_MB', 512)) * 1024 * 1024
+
+PATH_KEYS = ('csv', 'columns_dir', 'audio_dir', 'audio_compressed_dir', 'image_dir', 'image_thumbs_dir')
+
+
+class Dataset:
+    """One registered dataset: its settings and, once loaded, its data and derived state."""
+
+    def __init__(self, spec, base_dir):
+        self.id = spec['id']
+        self.label = spec.get('label', self.id)
+        paths = {key: os.path.join(base_dir, spec[key]) if spec.get(key) else None for key in PATH_KEYS}
+        self.csv_path = paths['csv']
+        self.columns_dir = paths['columns_dir']
+        self.audio_dir = paths['audio_dir']
+        self.audio_compressed_dir = paths['audio_compressed_dir']
+        self.image_dir = paths['image_dir']
+        self.image_thumbs_dir = paths['image_thumbs_dir']
+        self.column_map = dict(spec.get('columns', {}))
+        self.features = list(spec.get('features', PC_COLUMNS))
+        self.data = None
+        self._data_bytes = 0
+        self._derived = {}
+        # Size of each derived value when it was computed
+        self._derived_bytes = {}
+        # Reentrant: a factory may use other derived values
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f'Dataset({self.id!r})'
+
+    def load_columns(self, columns):
+        """DataFrame of the app-level ``columns``, renamed from the dataset's own names."""
+        df = load_columns([self.column_map.get(c, c) for c in columns],
+                          columns_dir=self.columns_dir, csv_path=self.csv_path)
+        df.columns = list(columns)
+        return df
+
+    def load(self, columns):
+        self.data = self.load_columns(columns)
+        self._data_bytes = int(self.data.memory_usage(index=False, deep=True).sum())
+        return self
+
+    @property
+    def nbytes(self):
+        """Approximate resident size: the loaded columns and the derived state.
+
+        Derived values that grow after they are computed (the figure cache)
+        report their current ``nbytes``; the others their size when computed.
+        """
+        if self.data is None:
+            return 0
+        derived = sum(int(getattr(value, 'nbytes', self._derived_bytes.get(name, 0)))
+                      for name, value in list(self._derived.items()))
+        return self._data_bytes + derived
+
+    def derived(self, name, factory):
+        """``factory()`` computed once per loaded dataset and dropped with it on eviction."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = factory()
+                    self._derived_bytes[name] = sizeof(value)
+                    self._derived[name] = value
+        return value
+
+
+class DatasetRegistry:
+    """Datasets listed in a manifest, loaded lazily into a memory-bounded LRU."""
+
+    def __init__(self, specs, default=None, columns=(), base_dir=BASE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.specs = OrderedDict((spec['id'], spec) for spec in specs)
+        self.default = default or next(iter(self.specs))
+        self.columns = list(columns)
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_manifest(cls, path=MANIFEST_PATH, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        return cls(manifest['datasets'], manifest.get('default'), base_dir=os.path.dirname(os.path.abspath(path)),
+                   **kwargs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __contains__(self, dataset_id):
+        return dataset_id in self.specs
+
+    def options(self):
+        """Dropdown options for the dataset selector."""
+        return [{'label': spec.get('label', dataset_id), 'value': dataset_id} for dataset_id, spec in self.specs.items()]
+
+    def describe(self, dataset_id):
+        """The dataset's settings, without loading its data."""
+        return Dataset(self.specs[dataset_id], self.base_dir)
+
+    def get(self, dataset_id=None):
+        """The loaded dataset ``dataset_id`` (default dataset if None). KeyError if unknown."""
+        dataset_id = dataset_id or self.default
+        with self._lock:
+            dataset = self._loaded.get(dataset_id)
+            if dataset is not None:
+                self._loaded.move_to_end(dataset_id)
+                # Derived state grows with use, so the budget is checked on every access
+                self._evict()
+                return dataset
+            dataset = self.describe(dataset_id).load(self.columns)
+            self._loaded[dataset_id] = dataset
+            self._evict()
+            return dataset
+
+    def _evict(self):
+        # The most recently used dataset always stays, even if it alone exceeds the budget
+        while len(self._loaded) > 1 and sum(d.nbytes for d in self._loaded.values()) > self.max_bytes:
+            self._loaded.popitem(last=False)
+
+    def loaded(self):
+        """Ids of the datasets currently in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the columnar artifacts of the registered datasets')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    args = parser.parse_args()
+
+    registry = DatasetRegistry.from_manifest(args.manifest)
+    for dataset_id in registry.specs:
+        dataset = registry.describe(dataset_id)
+        if not dataset.columns_dir:
+            print(f'{dataset_id}: no columns_dir, served from the CSV')
+            continue
+        manifest = build_columns(dataset.csv_path, dataset.columns_dir)
+        print(f"{dataset_id}: wrote {len(manifest['columns'])} columns x {manifest['rows']} rows "
+              f"to {dataset.columns_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Nearest-neighbor search over the per-call acoustic features (PC1..PC20).
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+PC_COLUMNS = [f'PC{i}' for i in range(1, 21)]
+
+
+class SimilarityIndex:
+    """Euclidean k-nearest-neighbor index over a feature matrix, one row per call.
+
+    Queries go through a KD-tree. ``brute_force`` is the vectorized NumPy
+    reference the tree is benchmarked against.
+    """
+
+    def __init__(self, features, leafsize=16):
+        self.features = np.ascontiguousarray(features, dtype=np.float64)
+        self.tree = cKDTree(self.features, leafsize=leafsize)
+        self._sq_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+    def __len__(self):
+        return len(self.features)
+
+    def query(self, vector, k):
+        """``(rows, distances)`` of the ``k`` rows nearest to ``vector``, closest first."""
+        k = min(k, len(self))
+        distances, rows = self.tree.query(vector, k=k)
+        return np.atleast_1d(rows), np.atleast_1d(distances)
+
+    def brute_force(self, vector, k):
+        """Same result as ``query`` from a full distance scan."""
+        k = min(k, len(self))
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, without materializing x - q
+        sq_dist = self._sq_norms - 2 * (self.features @ vector) + vector @ vector
+        rows = np.argpartition(sq_dist, k - 1)[:k]
+        rows = rows[np.argsort(sq_dist[rows])]
+        return rows, np.sqrt(np.maximum(sq_dist[rows], 0))
+
+    def similar_to(self, row, k):
+        """The ``k`` rows most similar to ``row``, excluding ``row`` itself."""
+        rows, distances = self.query(self.features[row], k + 1)
+        keep = rows != row
+        return rows[keep][:k], distances[keep][:k]
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+STFT spectrograms and waveform envelopes of the call WAVs, with a disk cache.
+
+Everything is vectorized NumPy: frames are a strided view of the signal,
+windowed and transformed with one ``rfft``. Results are stored under
+``.cache/spectrograms`` (SPECTROGRAM_CACHE_DIR) by a key hashing the WAV
+content and the parameters, so a repeat view is a file read and a changed
+WAV never serves a stale image. The parameters come from small fixed sets
+(N_FFTS, HOP_DIVISORS, FMAX_PRESETS, WAVEFORM_POINTS): the endpoints are
+public and nothing evicts the cache, so each WAV has at most a few hundred
+entries.
+
+    python spectrogram.py build [--n-fft 1024] [--hop 256] [--format webp] [--workers 4]
+
+precomputes the default view of every WAV in parallel.
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+from plotly.colors import hex_to_rgb, sequential
+
+from atomic import write_atomic
+from media import content_etag
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_DIR = os.path.join(BASE_DIR, 'audio')
+CACHE_DIR = os.environ.get('SPECTROGRAM_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'spectrograms'))
+
+DEFAULT_N_FFT = 1024
+DEFAULT_HOP = 256
+DEFAULT_POINTS = 1000
+N_FFTS = (256, 512, 1024, 2048, 4096)
+# hop is n_fft divided by one of these: 75% or 50% frame overlap
+HOP_DIVISORS = (4, 2)
+# Upper frequency limits in Hz; None (the default) is the full band
+FMAX_PRESETS = (2000, 4000, 8000, 16000)
+WAVEFORM_POINTS = (250, 500, 1000, 2000, 4000)
+# Noise-like spectrogram textures compress ~5x better as lossy WebP than as PNG
+DEFAULT_FORMAT = 'webp'
+# Quieter bins than this many dB below the loudest one render black
+DYNAMIC_RANGE_DB = 80.0
+FORMATS = {'png': 'image/png', 'webp': 'image/webp', 'json': 'application/json'}
+# Most STFT frames of one spectrogram: the frame matrix is at most this many n_fft-long rows
+MAX_FRAMES = 65536
+
+# 256-entry Viridis lookup table, the colorscale of the rest of the app's plots
+_stops = [hex_to_rgb(c) for c in sequential.Viridis]
+VIRIDIS_LUT = np.stack([np.interp(np.linspace(0, 1, 256), np.linspace(0, 1, len(_stops)), channel)
+                        for channel in zip(*_stops)], axis=1).round().astype(np.uint8)
+
+
+class SpectrogramParams:
+    """Validated STFT settings. ``ValueError`` on values outside the fixed sets.
+
+    ``n_fft`` is one of N_FFTS, ``hop`` is ``n_fft`` over one of
+    HOP_DIVISORS and ``fmax`` one of FMAX_PRESETS.
+    """
+
+    def __init__(self, n_fft=DEFAULT_N_FFT, hop=DEFAULT_HOP, fmax=None):
+        n_fft, hop = int(n_fft), int(hop)
+        if n_fft not in N_FFTS:
+            raise ValueError(f"n_fft must be one of {', '.join(map(str, N_FFTS))}")
+        if hop not in [n_fft // d for d in HOP_DIVISORS]:
+            raise ValueError(f"hop must be n_fft / {' or n_fft / '.join(map(str, HOP_DIVISORS))}")
+        if fmax is not None:
+            fmax = int(fmax)
+            if fmax not in FMAX_PRESETS:
+                raise ValueError(f"fmax must be one of {', '.join(map(str, FMAX_PRESETS))}")
+        self.n_fft = n_fft
+        self.hop = hop
+        self.fmax = fmax
+
+    def for_rate(self, sample_rate):
+        """These settings for a WAV at ``sample_rate``: an fmax at or above Nyquist is the full band."""
+        if self.fmax is not None and self.fmax >= sample_rate / 2:
+            return SpectrogramParams(self.n_fft, self.hop)
+        return self
+
+    def key(self):
+        return f'spec-{self.n_fft}-{self.hop}-{self.fmax or "nyquist"}'
+
+
+def read_wav(path):
+    """``(samples, sample_rate)``: mono float32 samples in [-1, 1]."""
+    with wave.open(path, 'rb') as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        # Little-endian 24-bit: widen to int32 by placing the bytes in the top three
+        b = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+        samples = (b[:, 0].astype(np.int32) << 8 | b[:, 1].astype(np.int32) << 16
+                   | b[:, 2].astype(np.int8).astype(np.int32) << 24).astype(np.float32) / 2 ** 31
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype).astype(np.float32) / np.iinfo(dtype).max
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def stft_db(samples, sample_rate, params):
+    """Power spectrogram in dB, ``(frequency bins, frames)``, and the bin frequencies."""
+    n_fft, hop = params.n_fft, params.hop
+    # Centered frames, as in librosa: pad half a window on both sides
+    padded = np.pad(samples, n_fft // 2, mode='reflect' if len(samples) > n_fft // 2 else 'constant')
+    if len(padded) < n_fft:
+        padded = np.pad(padded, (0, n_fft - len(padded)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop]
+    spectrum = np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    freqs = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    if params.fmax is not None:
+        keep = freqs <= params.fmax
+        power, freqs = power[:, keep], freqs[keep]
+    db = 10 * np.log10(np.maximum(power, 1e-12))
+    return db.T, freqs
+
+
+def quantize(db):
+    """dB values to uint8 over the top DYNAMIC_RANGE_DB, plus that range's ``(low, high)``."""
+    high = float(db.max())
+    low = high - DYNAMIC_RANGE_DB
+    levels = np.clip((db - low) / DYNAMIC_RANGE_DB * 255, 0, 255).astype(np.uint8)
+    return levels, (low, high)
+
+
+def render_spectrogram(path, params, fmt):
+    """Encoded spectrogram of the WAV at ``path`` in ``fmt`` (png, webp or json)."""
+    samples, rate = read_wav(path)
+    db, freqs = stft_db(samples, rate, params)
+    levels, (low, high) = quantize(db)
+    if fmt == 'json':
+        return json.dumps({
+            'shape': list(levels.shape),
+            'sampleRate': rate, 'nFft': params.n_fft, 'hop': params.hop,
+            'fmax': float(freqs[-1]), 'dbRange': [round(low, 2), round(high, 2)],
+            # Row-major uint8 levels, low frequencies first
+            'levels': base64.b64encode(levels.tobytes()).decode('ascii'),
+        }).encode('utf-8')
+    # Low frequencies at the bottom of the image
+    image = Image.fromarray(VIRIDIS_LUT[levels[::-1]], 'RGB')
+    buf = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buf, 'WEBP', quality=85)
+    else:
+        image.save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+
+def render_waveform(path, points):
+    """JSON min/max envelope of the WAV at ``path`` over ``points`` buckets."""
+    samples, rate = read_wav(path)
+    points = max(1, min(points, len(samples)))
+    edges = np.linspace(0, len(samples), points + 1).astype(np.int64)
+    # reduceat over bucket starts gives per-bucket extrema in one pass
+    lows = np.minimum.reduceat(samples, edges[:-1])
+    highs = np.maximum.reduceat(samples, edges[:-1])
+    return json.dumps({
+        'sampleRate': rate, 'duration': len(samples) / rate,
+        'min': np.round(lows, 4).tolist(), 'max': np.round(highs, 4).tolist(),
+    }).encode('utf-8')
+
+
+def cache_path(wav_path, variant, ext, cache_dir=CACHE_DIR):
+    """Content-addressed location of ``variant`` of ``wav_path``."""
+    key = hashlib.sha1(f'{content_etag(wav_path)}:{variant}'.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, key[:2], f'{key}.{ext}')
+
+
+def spectrogram_file(wav_path, params, fmt, cache_dir=CACHE_DIR):
+    """Path of the cached spectrogram, rendering it on a miss.
+
+    ``ValueError`` when the WAV is too long for ``params`` (more than MAX_FRAMES frames).
+    """
+    with wave.open(wav_path, 'rb') as f:
+        rate, n_samples = f.getframerate(), f.getnframes()
+    if n_samples // params.hop + 1 > MAX_FRAMES:
+        raise ValueError(f'hop {params.hop} gives more than {MAX_FRAMES} frames for this call, use a larger one')
+    params = params.for_rate(rate)
+    path = cache_path(wav_path, params.key(), fmt, cache_dir)
+    if not os.path.exists(path):
+        write_atomic(path, render_spectrogram(wav_path, params, fmt))
+    return path
+
+
+def waveform_file(wav_path, points, cache_dir=CACHE_DIR):
+    """Path of the cached waveform envelope, rendering it on a miss.
+
+    ``ValueError`` unless ``points`` is one of WAVEFORM_POINTS.
+    """
+    if points not in WAVEFORM_POINTS:
+        raise ValueError(f"points must be one of {', '.join(map(str, WAVEFORM_POINTS))}")
+    path = cache_path(wav_path, f'wave-{points}', 'json', cache_dir)
+    if not os.path.exists(path):
+        write_atomic(path, render_waveform(wav_path, points))
+    return path
+
+
+def _precompute(job):
+    wav_path, n_fft, hop, fmt, cache_dir = job
+    params = SpectrogramParams(n_fft, hop)
+    spectrogram_file(wav_path, params, fmt, cache_dir)
+    waveform_file(wav_path, DEFAULT_POINTS, cache_dir)
+    return os.path.basename(wav_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute spectrograms and waveforms of every WAV')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--n-fft', type=int, default=DEFAULT_N_FFT)
+    parser.add_argument('--hop', type=int, default=DEFAULT_HOP)
+    parser.add_argument('--format', choices=sorted(FORMATS), default=DEFAULT_FORMAT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--src', default=AUDIO_DIR)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    try:
+        SpectrogramParams(args.n_fft, args.hop)
+    except ValueError as e:
+        parser.error(str(e))
+    wavs = sorted(os.path.join(args.src, name) for name in os.listdir(args.src) if name.lower().endswith('.wav'))
+    jobs = [(path, args.n_fft, args.hop, args.format, args.cache_dir) for path in wavs]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        done = list(executor.map(_precompute, jobs, chunksize=8))
+    print(f'{len(done)} spectrograms and waveforms in {args.cache_dir}')
+
+
+if __name__ == '__main__':
+    main()
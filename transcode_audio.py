@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Transcode the WAVs in audio/ to compressed variants served by /segments.
+
+    python transcode_audio.py [--codec aac|opus] [--bitrate 96k] [--workers 4] [--force]
+
+Outputs go to audio_compressed/<stem>.m4a (AAC) or <stem>.ogg (Opus) and
+are only re-encoded when the source WAV is newer. Each encode writes
+<variant>.tmp and renames it into place; leftovers of an interrupted run
+are removed at the next start. The app falls back to
+the original WAV for any file without a variant. ffmpeg is taken from
+PATH, or from the imageio-ffmpeg package when it is not installed system-wide.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_DIR = os.path.join(BASE_DIR, 'audio')
+AUDIO_COMPRESSED_DIR = os.path.join(BASE_DIR, 'audio_compressed')
+
+# ffmpeg cannot infer the container from a .tmp name, hence the explicit -f
+CODECS = {
+    'aac': ('.m4a', ['-c:a', 'aac', '-movflags', '+faststart', '-f', 'ipod']),
+    'opus': ('.ogg', ['-c:a', 'libopus', '-f', 'ogg']),
+}
+
+
+def ffmpeg_exe():
+    exe = shutil.which('ffmpeg')
+    if exe is None:
+        try:
+            import imageio_ffmpeg
+        except ImportError:
+            raise SystemExit("ffmpeg not found: install it or `pip install imageio-ffmpeg`")
+        exe = imageio_ffmpeg.get_ffmpeg_exe()
+    return exe
+
+
+def transcode(ffmpeg, src, dst, codec, bitrate):
+    codec_args = CODECS[codec][1]
+    # The app skips *.tmp names when listing variants
+    tmp = dst + '.tmp'
+    subprocess.run([ffmpeg, '-v', 'error', '-y', '-i', src, *codec_args, '-b:a', bitrate, tmp],
+                   check=True, stdin=subprocess.DEVNULL)
+    os.replace(tmp, dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcode audio/ WAVs for streaming')
+    parser.add_argument('--codec', choices=sorted(CODECS), default=os.environ.get('AUDIO_CODEC', 'aac'))
+    parser.add_argument('--bitrate', default=os.environ.get('AUDIO_BITRATE', '96k'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='re-encode up-to-date files too')
+    parser.add_argument('--src', default=AUDIO_DIR)
+    parser.add_argument('--out', default=AUDIO_COMPRESSED_DIR)
+    args = parser.parse_args()
+
+    ffmpeg = ffmpeg_exe()
+    ext = CODECS[args.codec][0]
+    os.makedirs(args.out, exist_ok=True)
+    for name in os.listdir(args.out):
+        if name.endswith('.tmp'):
+            os.remove(os.path.join(args.out, name))
+
+    jobs = []
+    for name in sorted(os.listdir(args.src)):
+        stem, src_ext = os.path.splitext(name)
+        if src_ext.lower() != '.wav':
+            continue
+        src = os.path.join(args.src, name)
+        dst = os.path.join(args.out, stem + ext)
+        # Variants from a previously configured codec would shadow the new one
+        for other_ext, _ in CODECS.values():
+            other = os.path.join(args.out, stem + other_ext)
+            if other_ext != ext and os.path.exists(other):
+                os.remove(other)
+        if args.force or not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+            jobs.append((src, dst))
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for future in [pool.submit(transcode, ffmpeg, src, dst, args.codec, args.bitrate) for src, dst in jobs]:
+            future.result()
+
+    print(f"Transcoded {len(jobs)} file(s) to {args.codec} @ {args.bitrate} in {args.out}")
+
+
+if __name__ == '__main__':
+    main()